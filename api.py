@@ -0,0 +1,316 @@
+"""
+JSON REST API for the users and info tables (Flask blueprint)
+
+    GET    /api/v1/<table>                 keyset-paginated list (cursor, limit, sort)
+    GET    /api/v1/<table>/<id>            one record
+    GET    /api/v1/<table>/batch?ids=1,2   many records in one IN query
+    POST   /api/v1/<table>                 create one record
+    POST   /api/v1/<table>/batch           create many records in one transaction
+    PATCH  /api/v1/<table>/<id>            update one record
+    PATCH  /api/v1/<table>/batch           update many records in one transaction
+    DELETE /api/v1/<table>/<id>            delete one record
+    GET    /api/v1/<table>/changes         changes since a cursor (cursor, limit)
+
+Rows are selected as plain column tuples and encoded directly, without
+building ORM objects or calling to_dict().
+"""
+
+import json
+import logging
+from datetime import datetime
+from flask import Blueprint, Response, request
+from sqlalchemy import select, insert, update, delete, func, bindparam
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from database import db
+from models import User, Info
+from crud import execute_returning
+from pagination import paginate, DEFAULT_PAGE_SIZE
+from search import get_search_backend
+from cache import user_cache, info_cache, invalidate_record, bump_version
+from changes import changes_since, record_deletion, DEFAULT_CHANGES_LIMIT
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+    logger.warning("orjson is not installed; the API falls back to the slower stdlib JSON encoder")
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+COLUMNS = ('id', 'name', 'email', 'phone', 'address', 'created_at', 'updated_at')
+
+WRITABLE_FIELDS = ('name', 'email', 'phone', 'address')
+
+MAX_BATCH_SIZE = 1000
+
+TABLES = {
+    'users': (User, user_cache),
+    'info': (Info, info_cache),
+}
+
+
+class APIError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(payload):
+    """Encode a payload with orjson when available, else the stdlib encoder"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, default=_default, separators=(',', ':')).encode('utf-8')
+
+
+def json_response(payload, status=200):
+    return Response(dumps(payload), status=status, mimetype='application/json')
+
+
+def row_to_json(row):
+    """Map a column tuple (in COLUMNS order) to a JSON object"""
+    return dict(zip(COLUMNS, row))
+
+
+def _columns(model):
+    return [getattr(model, name) for name in COLUMNS]
+
+
+def _table(table):
+    if table not in TABLES:
+        raise APIError(404, f"Unknown table: {table}")
+    if table == 'users' and db.shards:
+        # These routes write the primary's users table directly; UserCRUD places users on shards
+        raise APIError(501, "The users table is sharded; use UserCRUD with shard_sessions")
+    return TABLES[table]
+
+
+def _json_body(expect):
+    body = request.get_json(silent=True)
+    if not isinstance(body, expect):
+        kind = 'an array' if expect is list else 'an object'
+        raise APIError(400, f"Request body must be {kind}")
+    if expect is list and len(body) > MAX_BATCH_SIZE:
+        raise APIError(400, f"At most {MAX_BATCH_SIZE} records per batch")
+    return body
+
+
+def _fields(record, required=False):
+    """Pick the writable fields of a JSON record"""
+    if not isinstance(record, dict):
+        raise APIError(400, "Each record must be an object")
+    values = {field: record[field] for field in WRITABLE_FIELDS if field in record}
+    if required and (not values.get('name') or not values.get('email')):
+        raise APIError(400, "name and email are required")
+    if 'name' in values and not values['name'] or 'email' in values and not values['email']:
+        raise APIError(400, "name and email cannot be empty")
+    return values
+
+
+def _after_write(model, cache, rows):
+    """Keep search indexes and caches in step with written rows"""
+    backend = get_search_backend(db.engine, model)
+    for row in rows:
+        backend.index_row(row.id, row.name, row.email)
+        invalidate_record(cache, row.id, row.email)
+    bump_version(model.__tablename__)
+
+
+def _fetch_by_ids(session, model, ids):
+    rows = session.execute(select(*_columns(model)).where(model.id.in_(ids))).all()
+    by_id = {row.id: row for row in rows}
+    return [by_id[record_id] for record_id in ids if record_id in by_id]
+
+
+@api.errorhandler(APIError)
+def handle_api_error(error):
+    return json_response({'error': error.message}, error.status)
+
+
+@api.errorhandler(IntegrityError)
+def handle_integrity_error(error):
+    db.request_session().rollback()
+    logger.error(f"API write failed - duplicate email: {error}")
+    return json_response({'error': "Email already exists"}, 409)
+
+
+@api.errorhandler(SQLAlchemyError)
+def handle_database_error(error):
+    db.request_session().rollback()
+    logger.error(f"API database error: {error}")
+    return json_response({'error': "Database error"}, 500)
+
+
+@api.route('/<table>', methods=['GET'])
+def list_records(table):
+    model, _ = _table(table)
+    session = db.request_read_session()
+    try:
+        page = paginate(
+            session.query(*_columns(model)),
+            model,
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', DEFAULT_PAGE_SIZE),
+            sort=request.args.get('sort', 'id'),
+        )
+    except ValueError as e:
+        raise APIError(400, str(e))
+    return json_response({
+        'items': [row_to_json(row) for row in page],
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor,
+    })
+
+
+@api.route('/<table>/changes', methods=['GET'])
+def list_changes(table):
+    model, _ = _table(table)
+    try:
+        batch = changes_since(
+            db.request_read_session(),
+            model,
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', DEFAULT_CHANGES_LIMIT, type=int),
+            columns=COLUMNS,
+        )
+    except ValueError as e:
+        raise APIError(400, str(e))
+    return json_response({
+        'changes': [
+            {'op': change.op, 'id': change.id, 'at': change.at,
+             'record': row_to_json(change.record) if change.record else None}
+            for change in batch
+        ],
+        'cursor': batch.cursor,
+        'has_more': batch.has_more,
+    })
+
+
+@api.route('/<table>/<int:record_id>', methods=['GET'])
+def get_record(table, record_id):
+    model, _ = _table(table)
+    row = db.request_read_session().execute(select(*_columns(model)).where(model.id == record_id)).first()
+    if row is None:
+        raise APIError(404, "Record not found")
+    return json_response(row_to_json(row))
+
+
+@api.route('/<table>/batch', methods=['GET'])
+def get_records(table):
+    model, _ = _table(table)
+    try:
+        ids = list(dict.fromkeys(int(value) for value in request.args.get('ids', '').split(',') if value))
+    except ValueError:
+        raise APIError(400, "ids must be a comma-separated list of integers")
+    if len(ids) > MAX_BATCH_SIZE:
+        raise APIError(400, f"At most {MAX_BATCH_SIZE} ids per batch")
+    rows = _fetch_by_ids(db.request_read_session(), model, ids) if ids else []
+    found = {row.id for row in rows}
+    return json_response({
+        'items': [row_to_json(row) for row in rows],
+        'missing': [record_id for record_id in ids if record_id not in found],
+    })
+
+
+@api.route('/<table>', methods=['POST'])
+def create_record(table):
+    model, cache = _table(table)
+    values = _fields(_json_body(dict), required=True)
+    session = db.request_session()
+    row = session.execute(insert(model).values(**values).returning(*_columns(model))).first()
+    session.commit()
+    _after_write(model, cache, [row])
+    return json_response(row_to_json(row), 201)
+
+
+@api.route('/<table>/batch', methods=['POST'])
+def create_records(table):
+    model, cache = _table(table)
+    records = [_fields(record, required=True) for record in _json_body(list)]
+    if not records:
+        return json_response({'items': []}, 201)
+    session = db.request_session()
+    # One multi-row INSERT ... RETURNING; a duplicate email rolls back the whole batch
+    rows = session.execute(insert(model).returning(*_columns(model), sort_by_parameter_order=True), records).all()
+    session.commit()
+    _after_write(model, cache, rows)
+    return json_response({'items': [row_to_json(row) for row in rows]}, 201)
+
+
+@api.route('/<table>/<int:record_id>', methods=['PATCH', 'PUT'])
+def update_record(table, record_id):
+    model, cache = _table(table)
+    values = _fields(_json_body(dict))
+    session = db.request_session()
+    stmt = update(model).where(model.id == record_id).values(updated_at=func.now(), **values)
+    row = execute_returning(session, stmt, *_columns(model))
+    if row is None:
+        session.rollback()
+        raise APIError(404, "Record not found")
+    if row is True:
+        row = session.execute(select(*_columns(model)).where(model.id == record_id)).first()
+    session.commit()
+    _after_write(model, cache, [row])
+    return json_response(row_to_json(row))
+
+
+@api.route('/<table>/batch', methods=['PATCH', 'PUT'])
+def update_records(table):
+    model, cache = _table(table)
+    changes = {}
+    for record in _json_body(list):
+        record_id = record.get('id') if isinstance(record, dict) else None
+        if not isinstance(record_id, int):
+            raise APIError(400, "Each record needs an integer id")
+        changes[record_id] = _fields(record)
+    if not changes:
+        return json_response({'items': []})
+
+    session = db.request_session()
+    ids = list(changes)
+    existing = set(session.scalars(select(model.id).where(model.id.in_(ids))))
+    missing = [record_id for record_id in ids if record_id not in existing]
+    if missing:
+        raise APIError(404, f"Records not found: {missing}")
+
+    # Group rows that set the same fields so each group is one executemany UPDATE
+    groups = {}
+    for record_id, values in changes.items():
+        groups.setdefault(tuple(sorted(values)), []).append({'_id': record_id, **values})
+    table_ = model.__table__
+    for fields, params in groups.items():
+        stmt = (
+            update(table_)
+            .where(table_.c.id == bindparam('_id'))
+            .values(updated_at=func.now(), **{field: bindparam(field) for field in fields})
+        )
+        session.execute(stmt, params)
+    session.commit()
+
+    rows = _fetch_by_ids(session, model, ids)
+    _after_write(model, cache, rows)
+    return json_response({'items': [row_to_json(row) for row in rows]})
+
+
+@api.route('/<table>/<int:record_id>', methods=['DELETE'])
+def delete_record(table, record_id):
+    model, cache = _table(table)
+    session = db.request_session()
+    row = execute_returning(session, delete(model).where(model.id == record_id), model.email)
+    if row is None:
+        session.rollback()
+        raise APIError(404, "Record not found")
+    record_deletion(session, model, record_id)
+    session.commit()
+    get_search_backend(db.engine, model).remove_row(record_id)
+    invalidate_record(cache, record_id, getattr(row, 'email', None))
+    bump_version(model.__tablename__)
+    return Response(status=204)
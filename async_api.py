@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Async JSON API for users, served by any ASGI server
+
+    uvicorn async_api:app --port 8001
+
+Requests are handled on one event loop with AsyncUserCRUD, so slow clients
+do not each hold a worker thread.
+"""
+
+import json
+import logging
+import re
+from urllib.parse import parse_qs
+from async_database import async_db
+from async_crud import AsyncUserCRUD
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+API_PREFIX = '/api/async/users'
+
+MAX_BODY_BYTES = 1024 * 1024
+
+crud = AsyncUserCRUD(async_db.get_session)
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _page_to_dict(page):
+    return {
+        'items': [user.to_dict() for user in page],
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor,
+    }
+
+
+def _user_or_404(user):
+    if user is None:
+        raise HTTPError(404, "User not found")
+    return user.to_dict()
+
+
+async def list_users(query, body):
+    page = await crud.get_users_page(
+        cursor=query.get('cursor'),
+        limit=query.get('limit', 50),
+        sort=query.get('sort', 'id'),
+    )
+    return 200, _page_to_dict(page)
+
+
+async def batch_users(query, body):
+    try:
+        ids = [int(value) for value in query.get('ids', '').split(',') if value]
+    except ValueError:
+        raise HTTPError(400, "ids must be a comma-separated list of integers")
+    emails = [value for value in query.get('emails', '').split(',') if value]
+    found = {}
+    if ids:
+        found.update({user.id: user for user in (await crud.get_users_by_ids(ids)).values()})
+    if emails:
+        found.update({user.id: user for user in (await crud.get_users_by_emails(emails)).values()})
+    return 200, {'items': [user.to_dict() for user in found.values()]}
+
+
+async def search_users(query, body):
+    term = query.get('q', '').strip()
+    if not term:
+        raise HTTPError(400, "q is required")
+    users = await crud.search_users(term, limit=max(1, min(int(query.get('limit', 50)), 500)))
+    return 200, {'items': [user.to_dict() for user in users]}
+
+
+async def create_user(query, body):
+    if not body.get('name') or not body.get('email'):
+        raise HTTPError(400, "name and email are required")
+    user = await crud.create_user(body['name'], body['email'], body.get('phone'), body.get('address'))
+    return 201, user.to_dict()
+
+
+async def get_user(query, body, user_id):
+    return 200, _user_or_404(await crud.get_user_by_id(user_id))
+
+
+async def update_user(query, body, user_id):
+    user = await crud.update_user(
+        user_id, body.get('name'), body.get('email'), body.get('phone'), body.get('address')
+    )
+    return 200, user.to_dict()
+
+
+async def delete_user(query, body, user_id):
+    await crud.delete_user(user_id)
+    return 204, None
+
+
+ROUTES = [
+    ('GET', re.compile(rf'^{API_PREFIX}/?$'), list_users),
+    ('POST', re.compile(rf'^{API_PREFIX}/?$'), create_user),
+    ('GET', re.compile(rf'^{API_PREFIX}/batch$'), batch_users),
+    ('GET', re.compile(rf'^{API_PREFIX}/search$'), search_users),
+    ('GET', re.compile(rf'^{API_PREFIX}/(\d+)$'), get_user),
+    ('PATCH', re.compile(rf'^{API_PREFIX}/(\d+)$'), update_user),
+    ('PUT', re.compile(rf'^{API_PREFIX}/(\d+)$'), update_user),
+    ('DELETE', re.compile(rf'^{API_PREFIX}/(\d+)$'), delete_user),
+]
+
+
+def _resolve(method, path):
+    allowed = False
+    for route_method, pattern, handler in ROUTES:
+        match = pattern.match(path)
+        if match:
+            if route_method == method:
+                return handler, [int(group) for group in match.groups()]
+            allowed = True
+    raise HTTPError(405 if allowed else 404, "Method not allowed" if allowed else "Not found")
+
+
+async def _read_body(receive):
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise HTTPError(413, "Request body too large")
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            break
+    raw = b''.join(chunks)
+    if not raw:
+        return {}
+    try:
+        body = json.loads(raw)
+    except ValueError:
+        raise HTTPError(400, "Invalid JSON body")
+    if not isinstance(body, dict):
+        raise HTTPError(400, "JSON body must be an object")
+    return body
+
+
+async def _send_json(send, status, payload):
+    body = b'' if payload is None else json.dumps(payload).encode('utf-8')
+    headers = [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            if await async_db.connect() and await async_db.create_tables():
+                await send({'type': 'lifespan.startup.complete'})
+            else:
+                await send({'type': 'lifespan.startup.failed', 'message': "Database connection failed"})
+        elif message['type'] == 'lifespan.shutdown':
+            await async_db.close()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    """ASGI entry point"""
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+    try:
+        if Config.get_shard_database_urls():
+            # AsyncUserCRUD only knows the primary; it cannot place users on shards
+            raise HTTPError(501, "The users table is sharded; the async API does not support shards")
+        handler, args = _resolve(scope['method'], scope['path'])
+        query = {key: values[-1] for key, values in parse_qs(scope.get('query_string', b'').decode()).items()}
+        body = await _read_body(receive) if scope['method'] in ('POST', 'PUT', 'PATCH') else {}
+        status, payload = await handler(query, body, *args)
+    except HTTPError as e:
+        status, payload = e.status, {'error': e.message}
+    except ValueError as e:
+        status = {'User not found': 404, 'Email already exists': 409}.get(str(e), 400)
+        payload = {'error': str(e)}
+    except Exception as e:
+        logger.error(f"Async API request failed: {e}")
+        status, payload = 500, {'error': "Internal server error"}
+    await _send_json(send, status, payload)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host='127.0.0.1', port=8001, log_level='warning')
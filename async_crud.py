@@ -0,0 +1,205 @@
+from sqlalchemy import select, delete
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from sqlalchemy.orm import make_transient_to_detached
+from models import User
+from crud import execute_returning, update_user_row
+from changes import record_deletion
+from pagination import paginate, DEFAULT_PAGE_SIZE
+from search import get_search_backend, search_rows, DEFAULT_SEARCH_LIMIT
+from cache import user_cache, row_to_dict, get_record, store_record, invalidate_record, bump_version
+from log_setup import get_sampled_logger
+
+logger = get_sampled_logger(__name__)
+
+class AsyncUserCRUD:
+    """asyncio counterpart of UserCRUD
+
+    Every method opens its own short-lived AsyncSession from ``session_factory``
+    (e.g. ``async_db.get_session``), so independent calls can safely run
+    concurrently under ``asyncio.gather``. Returned users are detached.
+    """
+
+    def __init__(self, session_factory, cache=user_cache):
+        self.session_factory = session_factory
+        self.cache = cache
+
+    @staticmethod
+    def _search_backend(session):
+        return get_search_backend(session.get_bind(), User)
+
+    def _cache_lookup(self, field, value):
+        hit, values = get_record(self.cache, field, value)
+        if values is None:
+            return hit, None
+        user = User(**values)
+        make_transient_to_detached(user)
+        return True, user
+
+    def _cache_store(self, field, value, user):
+        store_record(self.cache, field, value, row_to_dict(user) if user else None)
+
+    async def create_user(self, name: str, email: str, phone: str = None, address: str = None):
+        """Create a new user"""
+        async with self.session_factory() as session:
+            try:
+                user = User(name=name, email=email, phone=phone, address=address)
+                session.add(user)
+                await session.commit()
+                await session.refresh(user)
+                await session.run_sync(lambda s: self._search_backend(s).index_row(user.id, user.name, user.email))
+                invalidate_record(self.cache, user.id, user.email)
+                bump_version(User.__tablename__)
+                logger.info("User created successfully: %s", user.id)
+                return user
+            except IntegrityError as e:
+                await session.rollback()
+                logger.error(f"User creation failed - duplicate email: {e}")
+                raise ValueError("Email already exists")
+            except SQLAlchemyError as e:
+                await session.rollback()
+                logger.error(f"User creation failed: {e}")
+                raise Exception("Failed to create user")
+
+    async def get_user_by_id(self, user_id: int):
+        """Get user by ID"""
+        hit, user = self._cache_lookup('id', user_id)
+        if hit:
+            return user
+        try:
+            async with self.session_factory() as session:
+                user = await session.scalar(select(User).where(User.id == user_id))
+            self._cache_store('id', user_id, user)
+            if user is None:
+                logger.warning("User not found: %s", user_id)
+            return user
+        except SQLAlchemyError as e:
+            logger.error(f"Error retrieving user: {e}")
+            raise Exception("Failed to retrieve user")
+
+    async def get_user_by_email(self, email: str):
+        """Get user by email"""
+        hit, user = self._cache_lookup('email', email)
+        if hit:
+            return user
+        try:
+            async with self.session_factory() as session:
+                user = await session.scalar(select(User).where(User.email == email))
+            self._cache_store('email', email, user)
+            if user is None:
+                logger.warning("User not found with email: %s", email)
+            return user
+        except SQLAlchemyError as e:
+            logger.error(f"Error retrieving user by email: {e}")
+            raise Exception("Failed to retrieve user")
+
+    async def get_users_by_ids(self, user_ids):
+        """Get many users with one IN query; returns {id: user} for the ids that exist"""
+        user_ids = list(dict.fromkeys(user_ids))
+        if not user_ids:
+            return {}
+        try:
+            async with self.session_factory() as session:
+                users = (await session.scalars(select(User).where(User.id.in_(user_ids)))).all()
+            logger.info("Retrieved %s of %s requested users", len(users), len(user_ids))
+            return {user.id: user for user in users}
+        except SQLAlchemyError as e:
+            logger.error(f"Error retrieving users by ids: {e}")
+            raise Exception("Failed to retrieve users")
+
+    async def get_users_by_emails(self, emails):
+        """Get many users with one IN query; returns {email: user} for the emails that exist"""
+        emails = list(dict.fromkeys(emails))
+        if not emails:
+            return {}
+        try:
+            async with self.session_factory() as session:
+                users = (await session.scalars(select(User).where(User.email.in_(emails)))).all()
+            logger.info("Retrieved %s of %s requested users", len(users), len(emails))
+            return {user.email: user for user in users}
+        except SQLAlchemyError as e:
+            logger.error(f"Error retrieving users by emails: {e}")
+            raise Exception("Failed to retrieve users")
+
+    async def get_all_users(self, skip: int = 0, limit: int = 100):
+        """Get all users with pagination"""
+        try:
+            async with self.session_factory() as session:
+                users = (await session.scalars(select(User).order_by(User.id).offset(skip).limit(limit))).all()
+            logger.info("Retrieved %s users", len(users))
+            return users
+        except SQLAlchemyError as e:
+            logger.error(f"Error retrieving users: {e}")
+            raise Exception("Failed to retrieve users")
+
+    async def get_users_page(self, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE, sort: str = 'id'):
+        """Get one page of users using keyset pagination"""
+        try:
+            async with self.session_factory() as session:
+                page = await session.run_sync(
+                    lambda s: paginate(s.query(User), User, cursor=cursor, limit=limit, sort=sort)
+                )
+            logger.info("Retrieved page of %s users", len(page))
+            return page
+        except SQLAlchemyError as e:
+            logger.error(f"Error retrieving users page: {e}")
+            raise Exception("Failed to retrieve users")
+
+    async def update_user(self, user_id: int, name: str = None, email: str = None,
+                          phone: str = None, address: str = None):
+        """Update user information with a single UPDATE ... RETURNING statement"""
+        values = {field: value for field, value in
+                  (('name', name), ('email', email), ('phone', phone), ('address', address))
+                  if value is not None}
+        async with self.session_factory() as session:
+            try:
+                user = await session.run_sync(update_user_row, user_id, values)
+                if user is None:
+                    await session.rollback()
+                    raise ValueError("User not found")
+                await session.commit()
+                await session.run_sync(lambda s: self._search_backend(s).index_row(user.id, user.name, user.email))
+                invalidate_record(self.cache, user_id, user.email)
+                bump_version(User.__tablename__)
+                logger.info("User updated successfully: %s", user_id)
+                return user
+            except IntegrityError as e:
+                await session.rollback()
+                logger.error(f"User update failed - duplicate email: {e}")
+                raise ValueError("Email already exists")
+            except SQLAlchemyError as e:
+                await session.rollback()
+                logger.error(f"User update failed: {e}")
+                raise Exception("Failed to update user")
+
+    async def delete_user(self, user_id: int):
+        """Delete a user with a single DELETE ... RETURNING statement"""
+        async with self.session_factory() as session:
+            try:
+                row = await session.run_sync(execute_returning, delete(User).where(User.id == user_id), User.email)
+                if row is None:
+                    await session.rollback()
+                    raise ValueError("User not found")
+                await session.run_sync(record_deletion, User, user_id)
+                await session.commit()
+                await session.run_sync(lambda s: self._search_backend(s).remove_row(user_id))
+                invalidate_record(self.cache, user_id, getattr(row, 'email', None))
+                bump_version(User.__tablename__)
+                logger.info("User deleted successfully: %s", user_id)
+                return True
+            except SQLAlchemyError as e:
+                await session.rollback()
+                logger.error(f"User deletion failed: {e}")
+                raise Exception("Failed to delete user")
+
+    async def search_users(self, search_term: str, limit: int = DEFAULT_SEARCH_LIMIT):
+        """Search users by name or email, best matches first"""
+        try:
+            async with self.session_factory() as session:
+                users = await session.run_sync(
+                    lambda s: search_rows(s, self._search_backend(s), search_term, limit)
+                )
+            logger.info("Found %s users matching '%s'", len(users), search_term)
+            return users
+        except SQLAlchemyError as e:
+            logger.error(f"Error searching users: {e}")
+            raise Exception("Failed to search users")
@@ -0,0 +1,79 @@
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.exc import SQLAlchemyError
+from config import Config
+from database import QUEUE_POOL_OPTIONS
+from models import Base
+from metrics import instrument_engine
+from sqlite_profile import apply_profile
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Async driver used for each sync dialect in DATABASE_URL
+ASYNC_DRIVERS = {
+    'sqlite': 'aiosqlite',
+    'postgresql': 'asyncpg',
+}
+
+
+def to_async_url(database_url):
+    """Rewrite a sync database URL to use the matching asyncio driver"""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    driver = ASYNC_DRIVERS.get(backend)
+    if driver is None:
+        raise ValueError(f"No asyncio driver configured for {backend}")
+    return url.set(drivername=f"{backend}+{driver}")
+
+
+class AsyncDatabase:
+    """asyncio counterpart of Database, built on create_async_engine"""
+
+    def __init__(self):
+        self.engine = None
+        self.SessionLocal = None
+
+    async def connect(self):
+        """Create database connection"""
+        try:
+            database_url = Config.get_async_database_url() or to_async_url(Config.get_database_url())
+            options = Config.get_engine_options()
+            if make_url(database_url).get_backend_name() == 'sqlite':
+                # aiosqlite uses NullPool/StaticPool, which take no QueuePool sizing
+                for key in QUEUE_POOL_OPTIONS:
+                    options.pop(key, None)
+            self.engine = create_async_engine(database_url, **options)
+            instrument_engine(apply_profile(self.engine.sync_engine))
+            self.SessionLocal = async_sessionmaker(self.engine, autoflush=False, expire_on_commit=False)
+            logger.info("Async database connection established successfully")
+            return True
+        except (SQLAlchemyError, ValueError) as e:
+            logger.error(f"Async database connection failed: {e}")
+            return False
+
+    async def create_tables(self):
+        """Create all tables"""
+        try:
+            async with self.engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            logger.info("Tables created successfully")
+            return True
+        except SQLAlchemyError as e:
+            logger.error(f"Table creation failed: {e}")
+            return False
+
+    def get_session(self):
+        """Get an AsyncSession; use it as ``async with db.get_session() as session``"""
+        if not self.SessionLocal:
+            raise Exception("Database not connected. Call connect() first.")
+        return self.SessionLocal()
+
+    async def close(self):
+        """Close database connection"""
+        if self.engine:
+            await self.engine.dispose()
+            logger.info("Async database connection closed")
+
+# Global async database instance
+async_db = AsyncDatabase()
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for UserCRUD operations and the Flask routes
+
+Runs against a temporary SQLite database by default, or against the
+database in DATABASE_URL with --use-database-url (e.g. PostgreSQL):
+
+    python bench.py --rows 1000,100000 --output results.json
+    python bench.py --use-database-url --rows 100000 --clients 16
+    python bench.py --compare old.json new.json
+
+Results are written as JSON so runs from two versions can be diffed.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+DEFAULT_ROWS = '1000'
+DEFAULT_ITERATIONS = 200
+DEFAULT_CLIENTS = 8
+DEFAULT_REQUESTS = 400
+
+# A metric that gets this much slower (p50 or p95) counts as a regression
+DEFAULT_THRESHOLD = 0.10
+
+
+def percentile(sorted_samples, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_samples:
+        return 0.0
+    rank = max(0, min(len(sorted_samples) - 1, int(round(pct / 100.0 * len(sorted_samples) + 0.5)) - 1))
+    return sorted_samples[rank]
+
+
+def summarize(samples, elapsed):
+    """Latency percentiles (ms) and throughput for a list of per-call durations (s)"""
+    ordered = sorted(samples)
+    return {
+        'count': len(ordered),
+        'mean_ms': 1000 * sum(ordered) / len(ordered) if ordered else 0.0,
+        'p50_ms': 1000 * percentile(ordered, 50),
+        'p95_ms': 1000 * percentile(ordered, 95),
+        'p99_ms': 1000 * percentile(ordered, 99),
+        'max_ms': 1000 * ordered[-1] if ordered else 0.0,
+        'ops_per_sec': len(ordered) / elapsed if elapsed else 0.0,
+    }
+
+
+def time_calls(fn, args_list):
+    """Call ``fn(*args)`` for every args tuple and summarize the latencies"""
+    samples = []
+    started = time.perf_counter()
+    for args in args_list:
+        call_started = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - call_started)
+    return summarize(samples, time.perf_counter() - started)
+
+
+def seed(session, model, rows, prefix):
+    """Fill a table with ``rows`` synthetic records through the bulk import path"""
+    from bulk_import import bulk_insert
+
+    records = (
+        {'name': f"{prefix} User {i}", 'email': f"{prefix}{i}@bench.example", 'phone': f"555-{i:07d}",
+         'address': f"{i} Benchmark Street"}
+        for i in range(rows)
+    )
+    result = bulk_insert(session, model, records, chunk_size=10000)
+    return result.inserted
+
+
+def reset_tables(db):
+    from sqlalchemy import text
+    from models import Base
+
+    Base.metadata.drop_all(bind=db.engine)
+    # FTS5 tables are created outside the metadata; left behind, they would
+    # keep the previous run's rows (and triggers are dropped with the tables)
+    if db.engine.dialect.name == 'sqlite':
+        with db.engine.begin() as conn:
+            for table in Base.metadata.tables:
+                conn.execute(text(f"DROP TABLE IF EXISTS {table}_fts"))
+    from search import _registry
+    _registry.clear()
+    db.create_tables()
+
+
+def bench_crud(db, rows, iterations):
+    """Microbenchmarks for each UserCRUD method on a table of ``rows`` users"""
+    from crud import UserCRUD
+    from models import User
+    from pagination import encode_cursor
+    from projection import LIST_COLUMNS
+
+    session = db.get_session()
+    try:
+        seed(session, User, rows, 'crud')
+        crud = UserCRUD(session)
+        ids = [row[0] for row in session.query(User.id).all()]
+        sample_ids = [(random.choice(ids),) for _ in range(iterations)]
+        sample_emails = [(f"crud{random.randrange(rows)}@bench.example",) for _ in range(iterations)]
+        terms = [(f"User {random.randrange(rows)}",) for _ in range(iterations)]
+        # Cursor into the last tenth of the table in name order, so the deep
+        # page measures the keyset seek rather than the first rows
+        deep_row = session.query(User).order_by(User.name, User.id).offset(rows * 9 // 10).first()
+        deep_cursor = encode_cursor('name', 'next', deep_row) if deep_row is not None else None
+        created = []
+
+        def create(i):
+            created.append(crud.create_user(f"New {i}", f"new{i}@bench.example", '555', 'Somewhere').id)
+
+        results = {
+            'create_user': time_calls(create, [(i,) for i in range(iterations)]),
+            'get_user_by_id': time_calls(crud.get_user_by_id, sample_ids),
+            'get_user_by_email': time_calls(crud.get_user_by_email, sample_emails),
+            'get_all_users': time_calls(lambda: crud.get_all_users(limit=100), [()] * iterations),
+            'get_all_users_projected': time_calls(
+                lambda: crud.get_all_users(limit=100, columns=LIST_COLUMNS), [()] * iterations
+            ),
+            'get_users_page_first': time_calls(
+                lambda: crud.get_users_page(limit=100, sort='name'), [()] * iterations
+            ),
+            'get_users_page_deep': time_calls(
+                lambda: crud.get_users_page(cursor=deep_cursor, limit=100, sort='name'), [()] * iterations
+            ),
+            'update_user': time_calls(lambda user_id: crud.update_user(user_id, phone='555-0000'), sample_ids),
+            'search_users': time_calls(lambda term: crud.search_users(term, limit=20), terms),
+            'delete_user': time_calls(crud.delete_user, [(user_id,) for user_id in created]),
+        }
+    finally:
+        session.close()
+    return results
+
+
+class _ServerThread(threading.Thread):
+    """Serve a WSGI app on an ephemeral port in a background thread"""
+
+    def __init__(self, app):
+        from werkzeug.serving import make_server
+
+        super().__init__(daemon=True)
+        self.server = make_server('127.0.0.1', 0, app, threaded=True)
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def run(self):
+        self.server.serve_forever()
+
+    def stop(self):
+        self.server.shutdown()
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Report a redirect as its own response instead of following it"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+# Form POSTs answer with a redirect; following it would time a second request
+_opener = urllib.request.build_opener(_NoRedirect)
+
+
+def _request(method, url, data=None):
+    body = urllib.parse.urlencode(data).encode() if data is not None else None
+    request = urllib.request.Request(url, data=body, method=method)
+    started = time.perf_counter()
+    try:
+        with _opener.open(request) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        e.close()
+        status = e.code
+    return time.perf_counter() - started, status
+
+
+def _load(base_url, requests, clients):
+    """Issue (method, path, data) requests from ``clients`` concurrent workers"""
+    samples = []
+    errors = 0
+    lock = threading.Lock()
+
+    def worker(item):
+        nonlocal errors
+        method, path, data = item
+        duration, status = _request(method, base_url + path, data)
+        with lock:
+            samples.append(duration)
+            if status >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(worker, requests))
+    summary = summarize(samples, time.perf_counter() - started)
+    summary['errors'] = errors
+    summary['clients'] = clients
+    return summary
+
+
+def bench_http(db, rows, clients, requests):
+    """Concurrent load test of the Flask routes on a table of ``rows`` info records"""
+    from webapp import create_app
+    from models import Info
+
+    session = db.get_session()
+    try:
+        seed(session, Info, rows, 'http')
+        ids = [row[0] for row in session.query(Info.id).all()]
+    finally:
+        session.close()
+
+    server = _ServerThread(create_app())
+    server.start()
+    try:
+        base = server.base_url
+        deletable = random.sample(ids, min(requests, len(ids)))
+        return {
+            'GET /': _load(base, [('GET', '/', None)] * requests, clients),
+            'POST /add': _load(base, [
+                ('POST', '/add', {'name': f"Load {i}", 'email': f"load{i}@bench.example", 'phone': '555'})
+                for i in range(requests)
+            ], clients),
+            'GET /edit/<id>': _load(base, [
+                ('GET', f"/edit/{random.choice(ids)}", None) for _ in range(requests)
+            ], clients),
+            'POST /delete/<id>': _load(base, [
+                ('POST', f"/delete/{info_id}", None) for info_id in deletable
+            ], clients),
+            # Readers and writers at the same time: shows whether writes block reads
+            'mixed GET / + POST /add': _load(base, [
+                ('GET', '/', None) if i % 2 else
+                ('POST', '/add', {'name': f"Mixed {i}", 'email': f"mixed{i}@bench.example", 'phone': '555'})
+                for i in range(requests)
+            ], clients),
+        }
+    finally:
+        server.stop()
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL, text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    from database import db
+
+    if not db.connect():
+        raise SystemExit("❌ Could not connect to the database.")
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'revision': _git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'database': db.engine.dialect.name,
+            'iterations': args.iterations,
+            'clients': args.clients,
+            'requests': args.requests,
+        },
+        'runs': {},
+    }
+    try:
+        for rows in args.rows:
+            print(f"--- {rows} rows ---")
+            run_results = {}
+            if not args.skip_crud:
+                reset_tables(db)
+                run_results['crud'] = bench_crud(db, rows, args.iterations)
+                _print_section('UserCRUD', run_results['crud'])
+            if not args.skip_http:
+                reset_tables(db)
+                run_results['http'] = bench_http(db, rows, args.clients, args.requests)
+                _print_section('HTTP routes', run_results['http'])
+            results['runs'][str(rows)] = run_results
+    finally:
+        db.close()
+    return results
+
+
+def _print_section(title, section):
+    print(f"\n{title}")
+    print(f"  {'operation':<26}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ops/sec':>12}")
+    for name, stats in section.items():
+        print(f"  {name:<26}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}"
+              f"{stats['p99_ms']:>10.2f}{stats['ops_per_sec']:>12.0f}")
+
+
+def compare(old_path, new_path, threshold):
+    """Print metric deltas between two result files; returns the number of regressions"""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    regressions = 0
+    for rows, new_run in new['runs'].items():
+        old_run = old['runs'].get(rows, {})
+        for section, operations in new_run.items():
+            for name, stats in operations.items():
+                before = old_run.get(section, {}).get(name)
+                if not before:
+                    continue
+                for metric in ('p50_ms', 'p95_ms'):
+                    if not before[metric]:
+                        continue
+                    change = (stats[metric] - before[metric]) / before[metric]
+                    flag = ''
+                    if change > threshold:
+                        flag = '  ❌ regression'
+                        regressions += 1
+                    print(f"{rows:>8} {section:<5} {name:<26} {metric:<7} "
+                          f"{before[metric]:>9.2f} -> {stats[metric]:>9.2f} ({change:+.0%}){flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark UserCRUD and the Flask routes")
+    parser.add_argument('--rows', default=DEFAULT_ROWS,
+                        help="Comma-separated table sizes, e.g. 1000,100000,1000000")
+    parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS, help="Calls per CRUD operation")
+    parser.add_argument('--clients', type=int, default=DEFAULT_CLIENTS, help="Concurrent HTTP clients")
+    parser.add_argument('--requests', type=int, default=DEFAULT_REQUESTS, help="HTTP requests per route")
+    parser.add_argument('--use-database-url', action='store_true',
+                        help="Benchmark DATABASE_URL instead of a temporary SQLite file (tables are dropped!)")
+    parser.add_argument('--skip-crud', action='store_true')
+    parser.add_argument('--skip-http', action='store_true')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('-o', '--output', help="Write results JSON to this file")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help="Diff two result files and exit")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Relative slowdown that counts as a regression")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        return 1 if compare(args.compare[0], args.compare[1], args.threshold) else 0
+
+    args.rows = [int(value) for value in args.rows.split(',') if value]
+    random.seed(args.seed)
+
+    tmpdir = None
+    if not args.use_database_url:
+        tmpdir = tempfile.mkdtemp(prefix='crud-bench-')
+        # Must be set before config/database are imported
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    try:
+        results = run(args)
+    finally:
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✅ Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Bulk import of users/info records from CSV or JSONL files
+
+Rows are read in bounded chunks, each chunk is inserted with a single
+multi-row statement (COPY on PostgreSQL) and committed on its own, so
+memory stays flat no matter how large the input file is.
+"""
+
+import argparse
+import csv
+import io
+import json
+import logging
+import sys
+import time
+from itertools import islice
+from sqlalchemy import insert, select, func
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError, DataError, DBAPIError, InterfaceError, ProgrammingError
+from models import User, Info
+from cache import bump_version
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 5000
+
+IMPORT_FIELDS = ('name', 'email', 'phone', 'address')
+
+# Errors caused by the values of some row (duplicate email, over-long or
+# unbindable value); a chunk that hits one is retried row by row
+ROW_ERRORS = (IntegrityError, DataError, InterfaceError, ProgrammingError)
+
+TABLES = {
+    'users': User,
+    'info': Info,
+}
+
+
+class BulkResult:
+    """Outcome of a bulk import: counts, per-row errors and throughput"""
+
+    def __init__(self):
+        self.inserted = 0
+        self.errors = []
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def failed(self):
+        return len(self.errors)
+
+    @property
+    def rows_per_sec(self):
+        if not self.elapsed:
+            return 0.0
+        return (self.inserted + self.failed) / self.elapsed
+
+    def add_error(self, row_number, message):
+        self.errors.append((row_number, message))
+
+    def finish(self):
+        # Stored-email and per-row insert failures are found after the chunk's validation errors
+        self.errors.sort(key=lambda error: error[0])
+        self.elapsed = time.perf_counter() - self.started
+        return self
+
+    def __repr__(self):
+        return (f"<BulkResult(inserted={self.inserted}, failed={self.failed}, "
+                f"rows_per_sec={self.rows_per_sec:.0f})>")
+
+
+class InvalidRecord:
+    """Stands in for an input line that could not be parsed; reported as a row error"""
+
+    def __init__(self, message):
+        self.message = message
+
+
+def read_csv(stream):
+    """Yield one dict per CSV row (header row required)"""
+    for row in csv.DictReader(stream):
+        yield row
+
+
+def read_jsonl(stream):
+    """Yield one dict per non-blank JSONL line (an InvalidRecord for malformed ones)"""
+    for line in stream:
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield InvalidRecord("Invalid JSON")
+
+
+def read_records(path, fmt=None):
+    """Open ``path`` and yield records; format is taken from the extension by default"""
+    fmt = fmt or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+    reader = read_jsonl if fmt == 'jsonl' else read_csv
+    with open(path, newline='', encoding='utf-8') as stream:
+        yield from reader(stream)
+
+
+def chunked(iterable, size):
+    """Split an iterable into lists of at most ``size`` items"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _clean_row(row):
+    """Keep only importable fields, mapping blank strings to None"""
+    cleaned = {}
+    for field in IMPORT_FIELDS:
+        value = row.get(field)
+        if isinstance(value, str):
+            value = value.strip() or None
+        cleaned[field] = value
+    return cleaned
+
+
+def _prepare_chunk(session, model, numbered, result):
+    """Validate (row number, record) pairs and drop rows whose email is duplicated or already stored"""
+    candidates = []
+    seen = set()
+    for row_number, raw in numbered:
+        if isinstance(raw, InvalidRecord):
+            result.add_error(row_number, raw.message)
+            continue
+        try:
+            row = _clean_row(raw)
+        except AttributeError:
+            result.add_error(row_number, "Row is not an object")
+            continue
+        if not row['name'] or not row['email']:
+            result.add_error(row_number, "Name and email are required")
+            continue
+        if row['email'] in seen:
+            result.add_error(row_number, f"Duplicate email in input: {row['email']}")
+            continue
+        seen.add(row['email'])
+        candidates.append((row_number, row))
+
+    if candidates:
+        existing = set(session.scalars(
+            select(model.email).where(model.email.in_([row['email'] for _, row in candidates]))
+        ))
+        if existing:
+            kept = []
+            for row_number, row in candidates:
+                if row['email'] in existing:
+                    result.add_error(row_number, f"Email already exists: {row['email']}")
+                else:
+                    kept.append((row_number, row))
+            candidates = kept
+    return candidates
+
+
+def _copy_rows(session, model, rows):
+    """Load rows through PostgreSQL COPY, the fastest bulk path psycopg2 offers"""
+    # The database clock, as the column default (func.now()) would store it, so
+    # change-feed cursors see these rows like any other write
+    now = session.scalar(select(func.localtimestamp()))
+    fields = tuple(rows[0])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([row[field] if row[field] is not None else r'\N' for field in fields] + [now, now])
+    buffer.seek(0)
+    columns = ', '.join(fields + ('created_at', 'updated_at'))
+    statement = f"COPY {model.__tablename__} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+    dbapi = session.get_bind().dialect.dbapi
+    cursor = session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(statement, buffer)
+    except dbapi.Error as e:
+        # The raw cursor bypasses SQLAlchemy's exception wrapping
+        raise DBAPIError.instance(statement, None, e, dbapi.Error)
+    finally:
+        cursor.close()
+
+
+def _insert_rows(session, model, rows):
+    """Insert rows with one multi-row statement (executemany / insertmanyvalues)"""
+    if session.get_bind().dialect.name == 'postgresql':
+        _copy_rows(session, model, rows)
+    else:
+        session.execute(insert(model), rows)
+
+
+def _insert_one_by_one(session, model, candidates, result):
+    """Fallback when a chunk hits a row error mid-flight: isolate the bad rows with savepoints"""
+    for row_number, row in candidates:
+        try:
+            with session.begin_nested():
+                session.execute(insert(model), [row])
+            result.inserted += 1
+        except IntegrityError:
+            result.add_error(row_number, f"Email already exists: {row['email']}")
+        except ROW_ERRORS as e:
+            result.add_error(row_number, f"Invalid value: {str(e.orig).splitlines()[0]}")
+    session.commit()
+    bump_version(model.__tablename__)
+
+
+def insert_chunk(session, model, numbered, result, allocate_ids=None):
+    """Validate, insert and commit one chunk of (row number, record) pairs, recording the outcome in ``result``
+
+    ``allocate_ids(n)``, when given, supplies the ids of the rows inserted
+    (sharded tables); otherwise the database assigns them.
+    """
+    try:
+        candidates = _prepare_chunk(session, model, numbered, result)
+        if candidates:
+            if allocate_ids is not None:
+                candidates = [(row_number, {'id': row_id, **row})
+                              for (row_number, row), row_id in zip(candidates, allocate_ids(len(candidates)))]
+            try:
+                _insert_rows(session, model, [row for _, row in candidates])
+                session.commit()
+                result.inserted += len(candidates)
+                bump_version(model.__tablename__)
+            except ROW_ERRORS:
+                # A concurrent writer stored one of these emails after we checked,
+                # or a value was rejected; find the offending rows
+                session.rollback()
+                _insert_one_by_one(session, model, candidates, result)
+    except SQLAlchemyError as e:
+        session.rollback()
+        logger.error(f"Bulk insert chunk starting at row {numbered[0][0]} failed: {e}")
+        for row_number, _ in numbered:
+            result.add_error(row_number, "Chunk insert failed")
+
+
+def bulk_insert(session, model, records, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Insert an iterable of dict records in committed chunks and return a BulkResult"""
+    result = BulkResult()
+    for numbered in chunked(enumerate(records, 1), chunk_size):
+        insert_chunk(session, model, numbered, result)
+        logger.info(f"Bulk insert progress: {result.inserted} inserted, {result.failed} failed")
+    result.finish()
+    logger.info(f"Bulk insert finished: {result.inserted} rows in {result.elapsed:.2f}s "
+                f"({result.rows_per_sec:.0f} rows/sec)")
+    return result
+
+
+def main(argv=None):
+    """Command-line entry point: python bulk_import.py contacts.csv --table users"""
+    parser = argparse.ArgumentParser(description="Bulk import users/info from CSV or JSONL")
+    parser.add_argument('path', help="CSV (with header) or JSONL file")
+    parser.add_argument('--table', choices=sorted(TABLES), default='users')
+    parser.add_argument('--format', choices=['csv', 'jsonl'], default=None)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--show-errors', type=int, default=20, help="Number of row errors to print")
+    args = parser.parse_args(argv)
+
+    from database import db
+
+    if not db.connect():
+        print("❌ Could not connect to the database.")
+        return 1
+    db.ensure_schema()
+    session = db.get_session()
+    shard_sessions = db.get_shard_sessions() if args.table == 'users' else None
+    try:
+        records = read_records(args.path, args.format)
+        if shard_sessions:
+            # Users go to their shards through UserCRUD, like every other users write
+            from crud import UserCRUD
+            result = UserCRUD(session, shard_sessions=shard_sessions).bulk_create(records, args.chunk_size)
+        else:
+            result = bulk_insert(session, TABLES[args.table], records, args.chunk_size)
+    finally:
+        session.close()
+        for shard_session in shard_sessions or []:
+            shard_session.close()
+        db.close()
+
+    print(f"✅ Inserted {result.inserted} rows into {args.table} in {result.elapsed:.2f}s "
+          f"({result.rows_per_sec:.0f} rows/sec)")
+    if result.errors:
+        print(f"❌ {result.failed} rows failed:")
+        for row_number, message in result.errors[:args.show_errors]:
+            print(f"  row {row_number}: {message}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+Set-based bulk UPDATE/DELETE in bounded chunks
+
+Matching ids are walked in id order (keyset, like pagination.py), and each
+chunk is changed with one ``UPDATE``/``DELETE ... WHERE id IN (...)`` and
+committed on its own. Locks are held for one chunk at a time, and a failure
+keeps the chunks that already committed.
+"""
+
+import logging
+from sqlalchemy import select, update, delete, func, and_
+from bulk_import import chunked
+from changes import record_deletions
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BULK_CHUNK_SIZE = 1000
+
+# email is unique, so setting one value on many rows can never succeed
+BULK_UPDATE_FIELDS = ('name', 'phone', 'address')
+
+
+def where_clause(model, filters):
+    """Turn ``filters`` into a WHERE clause for ``model``
+
+    ``filters`` is either a SQLAlchemy expression (``User.email.like('%@old.example')``)
+    or a dict of column name to value; list/tuple/set values become ``IN``
+    and None becomes ``IS NULL``. An empty filter is rejected rather than
+    treated as "every row".
+    """
+    if filters is None or (isinstance(filters, dict) and not filters):
+        raise ValueError("A filter is required")
+    if not isinstance(filters, dict):
+        return filters
+    conditions = []
+    for name, value in filters.items():
+        if name not in model.__table__.columns:
+            raise ValueError(f"Unknown column: {name}")
+        column = getattr(model, name)
+        if value is None:
+            conditions.append(column.is_(None))
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            conditions.append(column.in_(list(value)))
+        else:
+            conditions.append(column == value)
+    return and_(*conditions)
+
+
+def update_values(values):
+    """Validate the columns of a bulk update"""
+    if not values:
+        raise ValueError("No values to update")
+    for name in values:
+        if name not in BULK_UPDATE_FIELDS:
+            raise ValueError(f"Cannot bulk update column: {name}")
+    return dict(values)
+
+
+def id_chunks(session, model, ids=None, where=None, chunk_size=DEFAULT_BULK_CHUNK_SIZE):
+    """Yield sorted lists of at most ``chunk_size`` ids, from ``ids`` or rows matching ``where``"""
+    if ids is not None:
+        yield from chunked(sorted(set(ids)), chunk_size)
+        return
+    last_id = None
+    while True:
+        stmt = select(model.id).where(where).order_by(model.id).limit(chunk_size)
+        if last_id is not None:
+            stmt = stmt.where(model.id > last_id)
+        chunk = list(session.scalars(stmt))
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1]
+
+
+def _in_chunk(model, chunk, where):
+    condition = model.id.in_(chunk)
+    # Re-check the filter: a row may have changed since its id was selected
+    return condition if where is None else and_(condition, where)
+
+
+def update_chunks(session, model, values, ids=None, where=None, chunk_size=DEFAULT_BULK_CHUNK_SIZE):
+    """Set ``values`` (and ``updated_at``) on the given rows
+
+    Yields the updated (id, name, email) rows of each chunk once it has
+    committed, so callers can invalidate caches as they go.
+    """
+    values = update_values(values)
+    dialect = session.get_bind().dialect
+    updated = 0
+    for chunk in id_chunks(session, model, ids, where, chunk_size):
+        condition = _in_chunk(model, chunk, where)
+        stmt = (
+            update(model).where(condition).values(updated_at=func.now(), **values)
+            .execution_options(synchronize_session=False)
+        )
+        try:
+            if dialect.update_returning:
+                rows = session.execute(stmt.returning(model.id, model.name, model.email)).all()
+            else:
+                rows = session.execute(select(model.id, model.name, model.email).where(condition)).all()
+                session.execute(stmt)
+            session.commit()
+        except Exception:
+            session.rollback()
+            logger.error(f"Bulk update of {model.__tablename__} stopped after {updated} rows")
+            raise
+        updated += len(rows)
+        logger.debug(f"Bulk updated {len(rows)} rows in {model.__tablename__}")
+        yield rows
+
+
+def delete_chunks(session, model, ids=None, where=None, chunk_size=DEFAULT_BULK_CHUNK_SIZE):
+    """Delete the given rows, leaving change-feed tombstones
+
+    Yields the deleted (id, email) rows of each chunk once it has committed.
+    """
+    dialect = session.get_bind().dialect
+    deleted = 0
+    for chunk in id_chunks(session, model, ids, where, chunk_size):
+        condition = _in_chunk(model, chunk, where)
+        stmt = delete(model).where(condition).execution_options(synchronize_session=False)
+        try:
+            if dialect.delete_returning:
+                rows = session.execute(stmt.returning(model.id, model.email)).all()
+            else:
+                rows = session.execute(select(model.id, model.email).where(condition)).all()
+                session.execute(stmt)
+            record_deletions(session, model, [row.id for row in rows])
+            session.commit()
+        except Exception:
+            session.rollback()
+            logger.error(f"Bulk delete from {model.__tablename__} stopped after {deleted} rows")
+            raise
+        deleted += len(rows)
+        logger.debug(f"Bulk deleted {len(rows)} rows from {model.__tablename__}")
+        yield rows
@@ -0,0 +1,227 @@
+"""
+Bounded in-process read-through cache for hot record lookups
+
+Entries are plain column dicts rather than ORM instances, so they can be
+shared safely between sessions and threads. Records are stored once under
+('id', id); ('email', email) keys only point at the id, so dropping the id
+entry is enough to invalidate every way of reaching a record.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import select, func
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Stored for lookups that found nothing, so repeated misses skip the database
+NOT_FOUND = object()
+
+CACHED_COLUMNS = ('id', 'name', 'email', 'phone', 'address', 'created_at', 'updated_at')
+
+
+def row_to_dict(row):
+    """Snapshot the cached columns of a model instance"""
+    return {column: getattr(row, column) for column in CACHED_COLUMNS}
+
+
+class LRUCache:
+    """Thread-safe LRU cache with per-entry TTL and short-lived negative entries"""
+
+    def __init__(self, max_size=10000, ttl=60.0, negative_ttl=5.0, name='cache'):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.name = name
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Return the cached value, NOT_FOUND for a cached miss, or None if absent/expired"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            if value is NOT_FOUND:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Store a value; pass NOT_FOUND to cache a negative result"""
+        ttl = self.negative_ttl if value is NOT_FOUND else self.ttl
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *keys):
+        """Drop the given keys if present"""
+        with self._lock:
+            for key in keys:
+                if self._data.pop(key, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """Counters for sizing the cache"""
+        with self._lock:
+            lookups = self.hits + self.negative_hits + self.misses
+            return {
+                'name': self.name,
+                'size': len(self._data),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'negative_hits': self.negative_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'hit_ratio': (self.hits + self.negative_hits) / lookups if lookups else 0.0,
+            }
+
+
+def reads_lagged(session):
+    """True for a session on a replica that may not have the latest writes yet
+
+    Nothing read through such a session may be cached: the entry would
+    outlive the lag and hide the write from readers of the primary.
+    """
+    return session.info.get('lagged', False)
+
+
+def get_record(cache, field, value):
+    """Look up a record by 'id' or 'email'; returns (hit, values or None)"""
+    if cache is None:
+        return False, None
+    entry = cache.get((field, value))
+    if entry is None:
+        return False, None
+    if entry is NOT_FOUND:
+        return True, None
+    if field == 'id':
+        return True, entry
+    values = cache.get(('id', entry))
+    if values is None or values is NOT_FOUND or values['email'] != value:
+        # The record changed or was evicted since the email was cached
+        return False, None
+    return True, values
+
+
+def store_record(cache, field, value, values):
+    """Cache a lookup result; ``values`` None caches a miss for ``(field, value)``"""
+    if cache is None:
+        return
+    if values is None:
+        cache.set((field, value), NOT_FOUND)
+        return
+    cache.set(('id', values['id']), values)
+    cache.set(('email', values['email']), values['id'])
+
+
+def invalidate_record(cache, record_id=None, *emails):
+    """Drop every cache key that may refer to a record"""
+    if cache is None:
+        return
+    keys = [('email', email) for email in emails if email]
+    if record_id is not None:
+        keys.append(('id', record_id))
+    cache.invalidate(*keys)
+
+
+def _make_cache(name):
+    if not Config.CACHE_ENABLED:
+        return None
+    return LRUCache(
+        max_size=Config.CACHE_MAX_SIZE,
+        ttl=Config.CACHE_TTL,
+        negative_ttl=Config.CACHE_NEGATIVE_TTL,
+        name=name,
+    )
+
+
+class TableVersions:
+    """Per-table write counters; a view cached under one version is stale once it changes"""
+
+    def __init__(self):
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, table):
+        with self._lock:
+            return self._versions.get(table, 0)
+
+    def bump(self, *tables):
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+
+# Shared per-process caches; None when caching is disabled in Config
+user_cache = _make_cache('users')
+info_cache = _make_cache('info')
+
+# Rendered page fragments keyed by table version; None when FRAGMENT_CACHE_SIZE is 0
+fragment_cache = LRUCache(
+    max_size=Config.FRAGMENT_CACHE_SIZE,
+    ttl=Config.FRAGMENT_CACHE_TTL,
+    negative_ttl=0,
+    name='fragments',
+) if Config.FRAGMENT_CACHE_SIZE > 0 else None
+
+table_versions = TableVersions()
+
+
+def bump_version(*tables):
+    """Record a committed write to ``tables`` (table names)"""
+    table_versions.bump(*tables)
+
+
+def table_state(session, model):
+    """Row count, highest id and latest ``updated_at`` of ``model`` in one query
+
+    Read from the database, so every worker sees a write as soon as it is
+    committed, whichever process made it.
+    """
+    return tuple(session.execute(select(func.count(), func.max(model.id), func.max(model.updated_at))).one())
+
+
+def version_tag(state):
+    """Validator for a view of a table whose table_state() is ``state``
+
+    The tag also rolls over every FRAGMENT_CACHE_TTL seconds, for writes
+    that leave the state as it was (an edit stamped within the same second
+    as the latest one).
+    """
+    window = int(time.time() // Config.FRAGMENT_CACHE_TTL) if Config.FRAGMENT_CACHE_TTL > 0 else 0
+    digest = hashlib.blake2b(repr(state).encode('utf-8'), digest_size=8).hexdigest()
+    return f"{digest}-{window}"
+
+
+def all_stats():
+    """Stats of every enabled cache"""
+    return [cache.stats() for cache in (user_cache, info_cache, fragment_cache) if cache is not None]
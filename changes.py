@@ -0,0 +1,153 @@
+"""
+Incremental change feed ("what changed since my last sync?")
+
+Inserts and updates are read from the ``(updated_at, id)`` index of the
+table; hard deletes leave a row in ``tombstones`` that is read the same way.
+Both streams are merged in timestamp order into bounded batches, and the
+opaque cursor returned with each batch resumes exactly after it.
+
+Changes younger than ``Config.CHANGE_FEED_LAG_SECONDS`` are held back: a
+transaction that stamped ``updated_at`` earlier but commits later would
+otherwise land behind a cursor that has already moved past it.
+"""
+
+import base64
+import json
+from collections import namedtuple
+from datetime import timedelta
+from sqlalchemy import select, insert, delete, func, tuple_
+from config import Config
+from models import Tombstone
+from pagination import _bind_key_value, _encode_value, _decode_value
+from projection import LIST_COLUMNS, row_class
+
+DEFAULT_CHANGES_LIMIT = 500
+MAX_CHANGES_LIMIT = 5000
+
+# op is 'upsert' (record is a projection row) or 'delete' (record is None)
+Change = namedtuple('Change', ('op', 'id', 'at', 'record'))
+
+
+class ChangeBatch:
+    """One batch of changes plus the cursor to resume after it"""
+
+    def __init__(self, changes, cursor, has_more, positions=None):
+        self.changes = changes
+        self.cursor = cursor
+        self.has_more = has_more
+        # (upserts key, deletes key) before each change and after the last one
+        self.positions = positions
+
+    def cursor_after(self, count):
+        """Cursor that resumes after the first ``count`` changes of this batch"""
+        return encode_cursor(*self.positions[count])
+
+    def __iter__(self):
+        return iter(self.changes)
+
+    def __len__(self):
+        return len(self.changes)
+
+
+def record_deletion(session, model, row_id):
+    """Add a tombstone for a deleted row; call inside the deleting transaction"""
+    session.execute(insert(Tombstone).values(table_name=model.__tablename__, row_id=row_id))
+
+
+def record_deletions(session, model, row_ids):
+    """Add tombstones for many deleted rows in one multi-row INSERT"""
+    if row_ids:
+        session.execute(insert(Tombstone), [
+            {'table_name': model.__tablename__, 'row_id': row_id} for row_id in row_ids
+        ])
+
+
+def prune_tombstones(session, older_than_days):
+    """Delete tombstones older than ``older_than_days``; returns how many were removed
+
+    Consumers whose cursor is older than that must do a full resync.
+    """
+    cutoff = session.scalar(select(func.now())) - timedelta(days=older_than_days)
+    query = session.query(Tombstone)
+    result = session.execute(delete(Tombstone).where(Tombstone.deleted_at < _bind_key_value(query, cutoff)))
+    session.commit()
+    return result.rowcount
+
+
+def encode_cursor(upserts_key, deletes_key):
+    payload = {
+        'u': [_encode_value(value) for value in upserts_key] if upserts_key else None,
+        'd': [_encode_value(value) for value in deletes_key] if deletes_key else None,
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a change-feed cursor into its (upserts key, deletes key)"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        keys = []
+        for name in ('u', 'd'):
+            key = payload[name]
+            if key is not None:
+                if len(key) != 2:
+                    raise ValueError
+                key = (_decode_value(key[0]), key[1])
+            keys.append(key)
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+    return keys[0], keys[1]
+
+
+def _after(query, sort_key, key, cutoff):
+    query = query.filter(sort_key[0] < _bind_key_value(query, cutoff))
+    if key is not None:
+        bound = [_bind_key_value(query, value) for value in key]
+        query = query.filter(tuple_(*sort_key) > tuple_(*bound))
+    return query.order_by(*[col.asc() for col in sort_key])
+
+
+def changes_since(session, model, cursor=None, limit=DEFAULT_CHANGES_LIMIT, columns=LIST_COLUMNS):
+    """Return a ChangeBatch of at most ``limit`` changes to ``model`` after ``cursor``
+
+    Start with ``cursor=None`` to read the table from the beginning, then
+    pass back ``batch.cursor`` (also when the batch is empty).
+    """
+    limit = max(1, min(int(limit), MAX_CHANGES_LIMIT))
+    upserts_key, deletes_key = decode_cursor(cursor) if cursor else (None, None)
+    cutoff = session.scalar(select(func.now())) - timedelta(seconds=Config.CHANGE_FEED_LAG_SECONDS)
+
+    columns = tuple(columns)
+    selected = columns + tuple(name for name in ('id', 'updated_at') if name not in columns)
+    make = row_class(model, selected)._make
+    query = session.query(*[getattr(model, name) for name in selected])
+    upserts = [make(row) for row in _after(query, (model.updated_at, model.id), upserts_key, cutoff)
+               .limit(limit + 1)]
+
+    query = session.query(Tombstone.deleted_at, Tombstone.id, Tombstone.row_id).filter(
+        Tombstone.table_name == model.__tablename__
+    )
+    deletes = _after(query, (Tombstone.deleted_at, Tombstone.id), deletes_key, cutoff).limit(limit + 1).all()
+
+    # Merge both streams by timestamp. On ties the delete goes first: upserts
+    # are read from the live rows, so a row that is still there was written
+    # after any delete that shares its timestamp
+    merged = sorted(
+        [((row.deleted_at, 0, row.id), 'delete', row) for row in deletes]
+        + [((row.updated_at, 1, row.id), 'upsert', row) for row in upserts],
+        key=lambda item: item[0],
+    )
+    has_more = len(merged) > limit
+    changes = []
+    positions = [(upserts_key, deletes_key)]
+    for _, op, row in merged[:limit]:
+        if op == 'upsert':
+            changes.append(Change('upsert', row.id, row.updated_at, row))
+            upserts_key = (row.updated_at, row.id)
+        else:
+            changes.append(Change('delete', row.row_id, row.deleted_at, None))
+            deletes_key = (row.deleted_at, row.id)
+        positions.append((upserts_key, deletes_key))
+    return ChangeBatch(changes, encode_cursor(upserts_key, deletes_key), has_more, positions)
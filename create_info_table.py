@@ -1,6 +1,6 @@
 from database import db
-from models import Info, Base
 
+# Runs create_all only when the recorded schema version is out of date
 db.connect()
-Base.metadata.create_all(bind=db.engine)
-print("Tables created!") 
\ No newline at end of file
+db.ensure_schema()
+print("Tables created!")
@@ -1,16 +1,139 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.orm import Session, make_transient_to_detached
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
-from models import User
-import logging
+from models import User, UserShard
+from pagination import paginate, DEFAULT_PAGE_SIZE
+from projection import project, projected_page, to_rows, LIST_COLUMNS
+from changes import changes_since, record_deletion, DEFAULT_CHANGES_LIMIT
+from sharding import shard_for_email, shard_for_id, allocate_ids, scatter, merge_by_id, merge_ranked, merge_pages
+from sharding import merge_changes, decode_shard_cursor, lookup_shards, claim_email, record_shards, release_emails
+from sharding import STALE_CLAIM_SECONDS
+from bulk_import import BulkResult, bulk_insert, insert_chunk, chunked, DEFAULT_CHUNK_SIZE
+from upsert import upsert_rows, clean_rows, UpsertResult, UNCHANGED, DEFAULT_UPSERT_CHUNK_SIZE
+import bulk_ops
+from bulk_ops import DEFAULT_BULK_CHUNK_SIZE
+from search import get_search_backend, search_rows, DEFAULT_SEARCH_LIMIT
+from group_commit import get_writer
+from config import Config
+from cache import user_cache, row_to_dict, get_record, store_record, invalidate_record, bump_version, reads_lagged
+from log_setup import get_sampled_logger
+import time
 
-logger = logging.getLogger(__name__)
+logger = get_sampled_logger(__name__)
+
+def execute_returning(session: Session, stmt, *columns):
+    """Run a single UPDATE/DELETE statement and report the matched row
+
+    Returns the first RETURNING row for ``columns``, or None when no row
+    matched. On dialects without RETURNING the rowcount is used instead and
+    ``True`` stands in for the row.
+    """
+    dialect = session.get_bind().dialect
+    supported = dialect.delete_returning if stmt.is_delete else dialect.update_returning
+    if supported:
+        return session.execute(stmt.returning(*columns)).first()
+    return True if session.execute(stmt).rowcount > 0 else None
+
+def update_user_row(session: Session, user_id: int, values: dict):
+    """UPDATE one user in a single statement and return it, or None if it does not exist
+
+    ``updated_at`` is always bumped. The returned user is expunged so its
+    RETURNING values survive the caller's commit without a refresh.
+    """
+    stmt = update(User).where(User.id == user_id).values(updated_at=func.now(), **values)
+    if session.get_bind().dialect.update_returning:
+        user = session.scalars(stmt.returning(User)).first()
+        if user is not None:
+            session.expunge(user)
+        return user
+    if session.execute(stmt).rowcount == 0:
+        return None
+    user = session.get(User, user_id, populate_existing=True)
+    session.expunge(user)
+    return user
 
 class UserCRUD:
-    def __init__(self, db_session: Session):
+    def __init__(self, db_session: Session, search_backend=None, cache=user_cache, group_commit=None,
+                 read_session: Session = None, shard_sessions=None):
         self.db = db_session
+        # One session per users shard (db.get_shard_sessions()); users are then routed by email
+        self.shard_sessions = shard_sessions
+        # Reads go to read_session (e.g. db.get_read_session()) when given
+        self.read_session = read_session
+        self._read_primary_until = 0.0
+        self._search_backend = search_backend
+        self.cache = cache
+        # Route create_user through the shared group-commit writer (Config.GROUP_COMMIT_ENABLED)
+        self.group_commit = Config.GROUP_COMMIT_ENABLED if group_commit is None else group_commit
+    
+    @property
+    def reader(self):
+        """Session for reads: the read session, or the primary shortly after a write (read-your-writes)"""
+        if self.read_session is None or time.monotonic() < self._read_primary_until:
+            return self.db
+        return self.read_session
+    
+    def _wrote(self):
+        self._read_primary_until = time.monotonic() + Config.READ_YOUR_WRITES_SECONDS
+    
+    @property
+    def search_backend(self):
+        """Search backend for the users table, chosen from Config on first use"""
+        if self._search_backend is None:
+            self._search_backend = get_search_backend(self.db.get_bind(), User)
+        return self._search_backend
+    
+    @property
+    def sharded(self):
+        return self.shard_sessions is not None
+    
+    def _session_for_id(self, user_id, read=False):
+        """Shard session holding ``user_id``, else the reader/primary session"""
+        if self.sharded:
+            return self.shard_sessions[shard_for_id(user_id, len(self.shard_sessions))]
+        return self.reader if read else self.db
+    
+    def _shard_for_email(self, email):
+        """Index of the shard holding ``email`` per the directory, else the one a new user would go to"""
+        return lookup_shards(self.db, [email]).get(email, shard_for_email(email, len(self.shard_sessions)))
+    
+    def _session_for_email(self, email, read=False):
+        if self.sharded:
+            return self.shard_sessions[self._shard_for_email(email)]
+        return self.reader if read else self.db
+    
+    def _search_backend_for(self, session):
+        if self.sharded:
+            return get_search_backend(session.get_bind(), User)
+        return self.search_backend
+    
+    def _stored_on(self, index, email):
+        return self.shard_sessions[index].query(User.id).filter(User.email == email).first() is not None
+    
+    def _claim_email(self, email, index):
+        """Reserve ``email`` in the directory for a user on shard ``index``; ValueError if another user has it
+
+        A stale entry (see STALE_CLAIM_SECONDS) is taken over.
+        """
+        if claim_email(self.db, email, index):
+            return
+        entry = self.db.get(UserShard, email, populate_existing=True)
+        if entry is None:
+            if claim_email(self.db, email, index):
+                return
+            raise ValueError("Email already exists")
+        if self._stored_on(entry.shard, email) or time.time() - entry.claimed_at < STALE_CLAIM_SECONDS:
+            raise ValueError("Email already exists")
+        entry.shard = index
+        entry.claimed_at = time.time()
+        self.db.commit()
     
     def create_user(self, name: str, email: str, phone: str = None, address: str = None):
         """Create a new user"""
+        if self.sharded:
+            return self._create_user_sharded(name, email, phone, address)
+        if self.group_commit:
+            return self._create_user_grouped(name, email, phone, address)
         try:
             user = User(
                 name=name,
@@ -21,7 +144,11 @@ class UserCRUD:
             self.db.add(user)
             self.db.commit()
             self.db.refresh(user)
-            logger.info(f"User created successfully: {user.id}")
+            self.search_backend.index_row(user.id, user.name, user.email)
+            invalidate_record(self.cache, user.id, user.email)
+            bump_version(User.__tablename__)
+            self._wrote()
+            logger.info("User created successfully: %s", user.id)
             return user
         except IntegrityError as e:
             self.db.rollback()
@@ -32,15 +159,227 @@ class UserCRUD:
             logger.error(f"User creation failed: {e}")
             raise Exception("Failed to create user")
     
+    def _insert_on_shard(self, index, values):
+        """Insert a user on shard ``index`` with an id that maps back to that shard"""
+        session = self.shard_sessions[index]
+        user_id = allocate_ids(session.get_bind(), User, index, len(self.shard_sessions))[0]
+        user = User(id=user_id, **values)
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+        self._search_backend_for(session).index_row(user.id, user.name, user.email)
+        return user
+    
+    def _create_user_sharded(self, name, email, phone, address):
+        index = shard_for_email(email, len(self.shard_sessions))
+        session = self.shard_sessions[index]
+        try:
+            self._claim_email(email, index)
+        except ValueError:
+            logger.error(f"User creation failed - duplicate email: {email}")
+            raise
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            logger.error(f"User creation failed: {e}")
+            raise Exception("Failed to create user")
+        try:
+            user = self._insert_on_shard(index, {'name': name, 'email': email, 'phone': phone, 'address': address})
+            invalidate_record(self.cache, user.id, user.email)
+            bump_version(User.__tablename__)
+            logger.info("User created successfully: %s", user.id)
+            return user
+        except IntegrityError as e:
+            session.rollback()
+            # Only a clash on users.email means the caller sent a duplicate;
+            # the entry then points at that stored user, so it stays
+            if self._stored_on(index, email):
+                logger.error(f"User creation failed - duplicate email: {e}")
+                raise ValueError("Email already exists")
+            release_emails(self.db, [email])
+            logger.error(f"User creation failed: {e}")
+            raise Exception("Failed to create user")
+        except SQLAlchemyError as e:
+            session.rollback()
+            release_emails(self.db, [email])
+            logger.error(f"User creation failed: {e}")
+            raise Exception("Failed to create user")
+    
+    def _create_user_grouped(self, name, email, phone, address):
+        """create_user via the group-commit writer; the commit is shared with concurrent callers"""
+        writer = get_writer(self.db.get_bind(), User)
+        try:
+            row = writer.insert({'name': name, 'email': email, 'phone': phone, 'address': address})
+        except ValueError:
+            logger.error(f"User creation failed - duplicate email: {email}")
+            raise
+        except Exception as e:
+            logger.error(f"User creation failed: {e}")
+            raise Exception("Failed to create user")
+        user = User(**row._asdict())
+        make_transient_to_detached(user)
+        user = self.db.merge(user, load=False)
+        self.search_backend.index_row(user.id, user.name, user.email)
+        invalidate_record(self.cache, user.id, user.email)
+        bump_version(User.__tablename__)
+        self._wrote()
+        logger.info("User created successfully: %s", user.id)
+        return user
+    
+    def bulk_create(self, rows, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """Create many users from an iterable of dicts, committing per chunk
+
+        Rows with missing fields or duplicate emails are reported in the
+        returned BulkResult instead of aborting the import.
+        """
+        if self.sharded:
+            return self._bulk_create_sharded(rows, chunk_size)
+        result = bulk_insert(self.db, User, rows, chunk_size)
+        if result.inserted:
+            # bulk_insert does not report ids, so backends kept in process reload
+            self.search_backend.rows_changed()
+            self._wrote()
+        if self.cache is not None and result.inserted:
+            # New rows may shadow cached "not found" entries
+            self.cache.clear()
+        logger.info("Bulk created %s users (%s failed)", result.inserted, result.failed)
+        return result
+    
+    def _bulk_create_sharded(self, rows, chunk_size):
+        """bulk_create with each chunk split by shard; row numbers still count the input rows"""
+        result = BulkResult()
+        count = len(self.shard_sessions)
+        for numbered in chunked(enumerate(rows, 1), chunk_size):
+            emails = [str(raw.get('email') or '').strip() if isinstance(raw, dict) else '' for _, raw in numbered]
+            # Emails already stored go to their shard, which reports them as duplicates
+            located = lookup_shards(self.db, {email for email in emails if email})
+            by_shard = {}
+            for (row_number, raw), email in zip(numbered, emails):
+                index = located.get(email, shard_for_email(email, count))
+                by_shard.setdefault(index, ([], []))
+                by_shard[index][0].append((row_number, raw))
+                if email and email not in located:
+                    by_shard[index][1].append(email)
+            for index, (shard_rows, new_emails) in by_shard.items():
+                session = self.shard_sessions[index]
+                inserted = result.inserted
+                insert_chunk(session, User, shard_rows, result,
+                             lambda n, engine=session.get_bind(), index=index: allocate_ids(engine, User, index, count, n))
+                if result.inserted > inserted:
+                    self._search_backend_for(session).rows_changed()
+                if new_emails:
+                    stored = session.scalars(select(User.email).where(User.email.in_(new_emails))).all()
+                    record_shards(self.db, {email: index for email in stored})
+        result.finish()
+        if self.cache is not None and result.inserted:
+            self.cache.clear()
+        logger.info("Bulk created %s users (%s failed)", result.inserted, result.failed)
+        return result
+    
+    def _upsert_chunk(self, rows, session=None):
+        """Upsert and commit one chunk of cleaned rows, then refresh search/cache for the rows written"""
+        if self.sharded and session is None:
+            return self._upsert_chunk_sharded(rows)
+        session = session or self.db
+        try:
+            upserted = upsert_rows(session, User, rows)
+            session.commit()
+        except SQLAlchemyError:
+            session.rollback()
+            raise
+        names = {row['email']: row['name'] for row in rows}
+        written = [row for row in upserted if row.status != UNCHANGED]
+        search_backend = self._search_backend_for(session)
+        for row in written:
+            search_backend.index_row(row.id, names[row.email], row.email)
+            invalidate_record(self.cache, row.id, row.email)
+        if written:
+            bump_version(User.__tablename__)
+            self._wrote()
+        return upserted
+    
+    def _upsert_chunk_sharded(self, rows):
+        """Upsert a chunk shard by shard: stored emails where they are, new ones on their hash shard
+
+        Every row gets an id allocated on its shard in case it is inserted;
+        ids of rows that turn out to be updates are simply skipped.
+        """
+        count = len(self.shard_sessions)
+        located = lookup_shards(self.db, [row['email'] for row in rows])
+        by_shard = {}
+        for row in rows:
+            by_shard.setdefault(located.get(row['email'], shard_for_email(row['email'], count)), []).append(row)
+        upserted = {}
+        for index, shard_rows in by_shard.items():
+            session = self.shard_sessions[index]
+            ids = allocate_ids(session.get_bind(), User, index, count, len(shard_rows))
+            shard_rows = [{'id': row_id, **row} for row, row_id in zip(shard_rows, ids)]
+            for row in self._upsert_chunk(shard_rows, session):
+                upserted[row.email] = row
+            # Every row of the group is now stored on this shard
+            record_shards(self.db, {row['email']: index for row in shard_rows if row['email'] not in located})
+        return [upserted[row['email']] for row in rows]
+    
+    def upsert_user(self, name: str, email: str, phone: str = None, address: str = None):
+        """Create a user, or update the one with this email in place; returns (user, status)
+
+        ``status`` is 'inserted', 'updated' or 'unchanged'. An unchanged user
+        is not written, so its ``updated_at`` stays as it was.
+        """
+        try:
+            row = self._upsert_chunk(clean_rows([{'name': name, 'email': email, 'phone': phone, 'address': address}]))[0]
+        except SQLAlchemyError as e:
+            logger.error(f"User upsert failed: {e}")
+            raise Exception("Failed to upsert user")
+        logger.info("User upserted (%s): %s", row.status, email)
+        return self.get_user_by_email(email), row.status
+    
+    def upsert_users(self, rows, chunk_size: int = DEFAULT_UPSERT_CHUNK_SIZE):
+        """Upsert many users from an iterable of dicts, one statement and commit per chunk
+
+        Returns an UpsertResult with inserted/updated/unchanged counts and
+        the per-row statuses. Chunks committed before a failure stay committed.
+        """
+        result = UpsertResult()
+        for chunk in chunked(rows, chunk_size):
+            try:
+                result.rows.extend(self._upsert_chunk(clean_rows(chunk)))
+            except SQLAlchemyError as e:
+                logger.error(f"User upsert failed after {len(result.rows)} rows: {e}")
+                raise Exception("Failed to upsert users")
+        result.finish()
+        logger.info("Upserted users: %s inserted, %s updated, %s unchanged",
+                    result.inserted, result.updated, result.unchanged)
+        return result
+    
+    def _cache_lookup(self, field, value, session):
+        """Return (hit, user) from the cache, attaching cached users to ``session``"""
+        hit, values = get_record(self.cache, field, value)
+        if values is None:
+            return hit, None
+        if self.sharded:
+            # Skips the directory lookup: the id names the shard
+            session = self._session_for_id(values['id'], read=True)
+        user = User(**values)
+        make_transient_to_detached(user)
+        return True, session.merge(user, load=False)
+    
+    def _cache_store(self, field, value, user, session):
+        if not reads_lagged(session):
+            store_record(self.cache, field, value, row_to_dict(user) if user else None)
+    
     def get_user_by_id(self, user_id: int):
         """Get user by ID"""
         try:
-            user = self.db.query(User).filter(User.id == user_id).first()
+            session = self._session_for_id(user_id, read=True)
+            hit, user = self._cache_lookup('id', user_id, session)
+            if not hit:
+                user = session.query(User).filter(User.id == user_id).first()
+                self._cache_store('id', user_id, user, session)
             if user:
-                logger.info(f"User retrieved: {user.id}")
+                logger.info("User retrieved: %s", user.id)
                 return user
             else:
-                logger.warning(f"User not found: {user_id}")
+                logger.warning("User not found: %s", user_id)
                 return None
         except SQLAlchemyError as e:
             logger.error(f"Error retrieving user: {e}")
@@ -49,81 +388,262 @@ class UserCRUD:
     def get_user_by_email(self, email: str):
         """Get user by email"""
         try:
-            user = self.db.query(User).filter(User.email == email).first()
+            session = None if self.sharded else self._session_for_email(email, read=True)
+            hit, user = self._cache_lookup('email', email, session)
+            if not hit:
+                session = session or self._session_for_email(email, read=True)
+                user = session.query(User).filter(User.email == email).first()
+                self._cache_store('email', email, user, session)
             if user:
-                logger.info(f"User retrieved by email: {email}")
+                logger.info("User retrieved by email: %s", email)
                 return user
             else:
-                logger.warning(f"User not found with email: {email}")
+                logger.warning("User not found with email: %s", email)
                 return None
         except SQLAlchemyError as e:
             logger.error(f"Error retrieving user by email: {e}")
             raise Exception("Failed to retrieve user")
     
-    def get_all_users(self, skip: int = 0, limit: int = 100):
-        """Get all users with pagination"""
+    def get_all_users(self, skip: int = 0, limit: int = 100, columns=None):
+        """Get all users with pagination
+
+        Pass ``columns`` (e.g. ``LIST_COLUMNS``) to get read-only projection
+        rows with just those fields instead of full User objects. With shards,
+        every shard is read in parallel and the results are merged by id.
+        """
         try:
-            users = self.db.query(User).offset(skip).limit(limit).all()
-            logger.info(f"Retrieved {len(users)} users")
+            if self.sharded:
+                users = self._get_all_users_sharded(skip, limit, columns)
+            elif columns is not None:
+                query = project(self.reader, User, columns).order_by(User.id)
+                users = to_rows(User, columns, query.offset(skip).limit(limit))
+            else:
+                users = self.reader.query(User).offset(skip).limit(limit).all()
+            logger.info("Retrieved %s users", len(users))
             return users
         except SQLAlchemyError as e:
             logger.error(f"Error retrieving users: {e}")
             raise Exception("Failed to retrieve users")
     
+    def _get_all_users_sharded(self, skip, limit, columns):
+        if columns is not None:
+            columns = tuple(columns) if 'id' in columns else ('id',) + tuple(columns)
+        
+        def fetch(session):
+            # Any shard may hold all of the first skip + limit users
+            if columns is not None:
+                return to_rows(User, columns, project(session, User, columns).order_by(User.id).limit(skip + limit))
+            return session.query(User).order_by(User.id).limit(skip + limit).all()
+        
+        return merge_by_id(scatter(fetch, self.shard_sessions), skip, limit)
+    
+    def get_users_page(self, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE, sort: str = 'id',
+                       columns=None):
+        """Get one page of users using keyset pagination
+
+        Pass the ``next_cursor``/``prev_cursor`` of a previous page to move
+        forward or back; ``sort`` may be 'id', 'created_at' or 'name'. With
+        ``columns`` the page holds projection rows instead of User objects.
+        """
+        try:
+            def fetch(session):
+                if columns is not None:
+                    return projected_page(session, User, columns, cursor=cursor, limit=limit, sort=sort)
+                return paginate(session.query(User), User, cursor=cursor, limit=limit, sort=sort)
+            
+            if self.sharded:
+                page = merge_pages(scatter(fetch, self.shard_sessions), cursor, limit, sort)
+            else:
+                page = fetch(self.reader)
+            logger.info("Retrieved page of %s users", len(page))
+            return page
+        except SQLAlchemyError as e:
+            logger.error(f"Error retrieving users page: {e}")
+            raise Exception("Failed to retrieve users")
+    
     def update_user(self, user_id: int, name: str = None, email: str = None, 
                    phone: str = None, address: str = None):
-        """Update user information"""
+        """Update user information
+
+        Runs as a single UPDATE ... RETURNING statement; a missing row is
+        detected from the (empty) result instead of a prior SELECT. With
+        shards, the user keeps its shard and id when its email changes.
+        """
+        session = self._session_for_id(user_id)
+        # New email reserved in the shard directory, and the one it replaces
+        claimed = old_email = None
         try:
-            user = self.get_user_by_id(user_id)
-            if not user:
+            values = {field: value for field, value in
+                      (('name', name), ('email', email), ('phone', phone), ('address', address))
+                      if value is not None}
+            if email is not None and self.sharded:
+                old_email = session.scalar(select(User.email).where(User.id == user_id))
+                if old_email is not None and old_email != email:
+                    try:
+                        self._claim_email(email, shard_for_id(user_id, len(self.shard_sessions)))
+                    except ValueError:
+                        logger.error(f"User update failed - duplicate email: {email}")
+                        raise
+                    claimed = email
+            user = update_user_row(session, user_id, values)
+            if user is None:
+                session.rollback()
+                self._release_claim(claimed)
                 raise ValueError("User not found")
+            session.commit()
+            if claimed:
+                release_emails(self.db, [old_email])
             
-            if name is not None:
-                user.name = name
-            if email is not None:
-                user.email = email
-            if phone is not None:
-                user.phone = phone
-            if address is not None:
-                user.address = address
-            
-            self.db.commit()
-            self.db.refresh(user)
-            logger.info(f"User updated successfully: {user_id}")
+            self._search_backend_for(session).index_row(user.id, user.name, user.email)
+            invalidate_record(self.cache, user_id, user.email)
+            bump_version(User.__tablename__)
+            self._wrote()
+            logger.info("User updated successfully: %s", user_id)
             return user
         except IntegrityError as e:
-            self.db.rollback()
+            session.rollback()
+            self._release_claim(claimed)
             logger.error(f"User update failed - duplicate email: {e}")
             raise ValueError("Email already exists")
         except SQLAlchemyError as e:
-            self.db.rollback()
+            session.rollback()
+            self._release_claim(claimed)
             logger.error(f"User update failed: {e}")
             raise Exception("Failed to update user")
     
+    def _release_claim(self, email):
+        if email is not None:
+            release_emails(self.db, [email])
+    
     def delete_user(self, user_id: int):
-        """Delete a user"""
+        """Delete a user with a single DELETE ... RETURNING statement"""
+        session = self._session_for_id(user_id)
         try:
-            user = self.get_user_by_id(user_id)
-            if not user:
+            row = execute_returning(session, delete(User).where(User.id == user_id), User.email)
+            if row is None:
+                session.rollback()
                 raise ValueError("User not found")
+            email = getattr(row, 'email', None)
+            record_deletion(session, User, user_id)
             
-            self.db.delete(user)
-            self.db.commit()
-            logger.info(f"User deleted successfully: {user_id}")
+            session.commit()
+            if self.sharded and email:
+                release_emails(self.db, [email])
+            self._search_backend_for(session).remove_row(user_id)
+            invalidate_record(self.cache, user_id, email)
+            bump_version(User.__tablename__)
+            self._wrote()
+            logger.info("User deleted successfully: %s", user_id)
             return True
         except SQLAlchemyError as e:
-            self.db.rollback()
+            session.rollback()
             logger.error(f"User deletion failed: {e}")
             raise Exception("Failed to delete user")
     
-    def search_users(self, search_term: str):
-        """Search users by name or email"""
+    def _bulk_targets(self, ids):
+        """(session, ids) pairs to run a bulk operation on; ids is None for filter-based runs"""
+        if not self.sharded:
+            return [(self.db, ids)]
+        if ids is None:
+            return [(session, None) for session in self.shard_sessions]
+        by_shard = {}
+        for user_id in ids:
+            by_shard.setdefault(shard_for_id(user_id, len(self.shard_sessions)), []).append(user_id)
+        return [(self.shard_sessions[index], shard_ids) for index, shard_ids in by_shard.items()]
+    
+    def bulk_update(self, filters, values: dict, chunk_size: int = DEFAULT_BULK_CHUNK_SIZE):
+        """Set ``values`` on every user matching ``filters``; returns the number of users updated
+
+        ``filters`` is a dict such as ``{'phone': None}`` or an expression such
+        as ``User.email.like('%@old.example')``. Runs as chunked
+        ``UPDATE ... WHERE id IN (...)`` statements, one commit per chunk.
+        """
+        where = bulk_ops.where_clause(User, filters)
+        values = bulk_ops.update_values(values)
+        count = 0
         try:
-            users = self.db.query(User).filter(
-                (User.name.ilike(f"%{search_term}%")) |
-                (User.email.ilike(f"%{search_term}%"))
-            ).all()
-            logger.info(f"Found {len(users)} users matching '{search_term}'")
+            for session, _ in self._bulk_targets(None):
+                backend = self._search_backend_for(session)
+                for rows in bulk_ops.update_chunks(session, User, values, where=where, chunk_size=chunk_size):
+                    for row in rows:
+                        backend.index_row(row.id, row.name, row.email)
+                        invalidate_record(self.cache, row.id, row.email)
+                    count += len(rows)
+        except SQLAlchemyError as e:
+            logger.error(f"Bulk user update failed after {count} users: {e}")
+            raise Exception("Failed to update users")
+        finally:
+            if count:
+                bump_version(User.__tablename__)
+                self._wrote()
+        logger.info("Bulk updated %s users", count)
+        return count
+    
+    def bulk_delete(self, ids=None, filters=None, chunk_size: int = DEFAULT_BULK_CHUNK_SIZE):
+        """Delete users by id list or by ``filters`` (as in bulk_update); returns the number deleted
+
+        Runs as chunked ``DELETE ... WHERE id IN (...)`` statements, one
+        commit per chunk; ids that do not exist are ignored.
+        """
+        if ids is None:
+            where = bulk_ops.where_clause(User, filters)
+        elif filters is not None:
+            raise ValueError("Pass either ids or filters, not both")
+        else:
+            where = None
+        count = 0
+        try:
+            for session, target_ids in self._bulk_targets(ids):
+                backend = self._search_backend_for(session)
+                for rows in bulk_ops.delete_chunks(session, User, ids=target_ids, where=where, chunk_size=chunk_size):
+                    for row in rows:
+                        backend.remove_row(row.id)
+                        invalidate_record(self.cache, row.id, row.email)
+                    if self.sharded:
+                        release_emails(self.db, [row.email for row in rows])
+                    count += len(rows)
+        except SQLAlchemyError as e:
+            logger.error(f"Bulk user deletion failed after {count} users: {e}")
+            raise Exception("Failed to delete users")
+        finally:
+            if count:
+                bump_version(User.__tablename__)
+                self._wrote()
+        logger.info("Bulk deleted %s users", count)
+        return count
+    
+    def changes_since(self, cursor: str = None, limit: int = DEFAULT_CHANGES_LIMIT, columns=LIST_COLUMNS):
+        """Get users created, updated or deleted after ``cursor``
+
+        Returns a ChangeBatch; pass its ``cursor`` to the next call to resume.
+        Start with ``cursor=None`` for a full initial sync.
+        """
+        try:
+            if self.sharded:
+                cursors = decode_shard_cursor(cursor, len(self.shard_sessions))
+                batch = merge_changes(scatter(
+                    lambda shard: changes_since(shard[0], User, cursor=shard[1], limit=limit, columns=columns),
+                    list(zip(self.shard_sessions, cursors)),
+                ), limit)
+            else:
+                batch = changes_since(self.reader, User, cursor=cursor, limit=limit, columns=columns)
+            logger.info("Retrieved %s user changes", len(batch))
+            return batch
+        except SQLAlchemyError as e:
+            logger.error(f"Error retrieving user changes: {e}")
+            raise Exception("Failed to retrieve changes")
+    
+    def search_users(self, search_term: str, limit: int = DEFAULT_SEARCH_LIMIT, columns=None):
+        """Search users by name or email, best matches first"""
+        try:
+            if self.sharded:
+                users = merge_ranked(scatter(
+                    lambda session: search_rows(session, self._search_backend_for(session), search_term, limit, columns),
+                    self.shard_sessions,
+                ), limit)
+            else:
+                users = search_rows(self.reader, self.search_backend, search_term, limit, columns)
+            logger.info("Found %s users matching '%s'", len(users), search_term)
             return users
         except SQLAlchemyError as e:
             logger.error(f"Error searching users: {e}")
@@ -1,52 +1,439 @@
-from sqlalchemy import create_engine
+import hashlib
+import itertools
+import os
+import threading
+import time
+from sqlalchemy import create_engine, MetaData, Table, Column, String, select, delete, insert, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.exc import SQLAlchemyError, TimeoutError as PoolTimeoutError
 from config import Config
 from models import Base
+from metrics import instrument_engine, configure_slow_query_log
+from sharding import Shards, backfill_directory
+import sqlite_profile
+from log_setup import configure_logging
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging (LOG_* settings; see log_setup.py)
+configure_logging()
 logger = logging.getLogger(__name__)
 
+# Pool arguments only a QueuePool understands
+QUEUE_POOL_OPTIONS = ('pool_size', 'max_overflow', 'pool_timeout')
+
+# Records which version of Base.metadata the database was last created from
+schema_version_table = Table(
+    'schema_version', MetaData(),
+    Column('version', String(64), primary_key=True),
+)
+
+
+def schema_fingerprint(metadata):
+    """Stable hash of the tables, columns and indexes in ``metadata``"""
+    parts = []
+    for table in metadata.sorted_tables:
+        parts.append(f"table {table.name}")
+        for column in table.columns:
+            parts.append(f"column {table.name}.{column.name} {column.type!r} {column.nullable} {column.unique}")
+        if table.dialect_kwargs:
+            parts.append(f"options {table.name} {sorted(table.dialect_kwargs.items())}")
+        for index in sorted(table.indexes, key=lambda index: index.name or ''):
+            parts.append(f"index {index.name} {[column.name for column in index.columns]} {index.unique}")
+    return hashlib.sha1('\n'.join(parts).encode('utf-8')).hexdigest()
+
+
+SCHEMA_VERSION = schema_fingerprint(Base.metadata)
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait for a connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+
+
+class ReadReplicas:
+    """Round-robin over read engines, skipping ones that failed their last health check"""
+
+    def __init__(self, engines, check_interval=None, lagged=True):
+        self.engines = engines
+        # False when the "replicas" read the primary's own database file (SQLite profile)
+        self.lagged = lagged
+        self.check_interval = Config.READ_HEALTH_CHECK_INTERVAL if check_interval is None else check_interval
+        self._health = {engine: (True, 0.0) for engine in engines}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def _healthy(self, engine):
+        healthy, checked_at = self._health[engine]
+        now = time.monotonic()
+        if now - checked_at < self.check_interval:
+            return healthy
+        try:
+            with engine.connect() as conn:
+                conn.execute(text('SELECT 1'))
+            healthy = True
+        except SQLAlchemyError as e:
+            if self._health[engine][0]:
+                logger.warning(f"Read replica {engine.url.render_as_string(hide_password=True)} is unhealthy: {e}")
+            healthy = False
+        with self._lock:
+            self._health[engine] = (healthy, now)
+        return healthy
+
+    def choose(self):
+        """Next healthy read engine, or None when there is none"""
+        for _ in range(len(self.engines)):
+            engine = self.engines[next(self._counter) % len(self.engines)]
+            if self._healthy(engine):
+                return engine
+        return None
+
+    def stats(self):
+        with self._lock:
+            return [
+                {'url': engine.url.render_as_string(hide_password=True), 'healthy': healthy}
+                for engine, (healthy, _) in self._health.items()
+            ]
+
+    def dispose(self, close=True):
+        for engine in self.engines:
+            engine.dispose(close=close)
+
+
 class Database:
+    """Engine and session factory, created lazily on first use
+
+    Writes always go to the primary engine (DATABASE_URL). When
+    DATABASE_READ_URLS is set, get_read_session()/request_read_session()
+    spread reads over those replicas instead; for a SQLite file the SQLite
+    profile adds a read engine on the same file. When DATABASE_SHARD_URLS is
+    set, ``shards`` holds one engine per users shard (see sharding.py).
+    """
+
     def __init__(self):
-        self.engine = None
+        self._engine = None
         self.SessionLocal = None
-        
+        self.replicas = None
+        self.shards = None
+        self.maintenance = None
+        self._connect_lock = threading.Lock()
+        self._schema_checked = False
+    
+    @property
+    def engine(self):
+        """The engine, connecting (and checking the schema) on first access"""
+        if self._engine is None:
+            self.ensure_connected()
+        return self._engine
+    
+    @property
+    def connected(self):
+        return self._engine is not None
+    
+    def _engine_options(self, database_url, writer=False):
+        """Engine options from Config, minus pool settings the backend cannot use"""
+        options = Config.get_engine_options()
+        url = make_url(database_url)
+        if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+            # In-memory SQLite uses a single shared connection, not a QueuePool
+            for key in QUEUE_POOL_OPTIONS:
+                options.pop(key, None)
+        else:
+            options['poolclass'] = TimedQueuePool
+        if sqlite_profile.enabled_for(database_url):
+            options['connect_args'] = sqlite_profile.connect_args()
+            if writer:
+                # SQLite allows one writer at a time; queue writers in the pool, not on the file lock
+                options['pool_size'] = 1
+                options['max_overflow'] = 0
+        return options
+    
+    def _create_engine(self, database_url, writer=False):
+        engine = create_engine(database_url, **self._engine_options(database_url, writer))
+        return instrument_engine(sqlite_profile.apply_profile(engine))
+    
     def connect(self):
         """Create database connection"""
         try:
             database_url = Config.get_database_url()
-            self.engine = create_engine(database_url, echo=True)
-            self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+            read_urls = Config.get_read_database_urls()
+            split = not read_urls and Config.SQLITE_SINGLE_WRITER and sqlite_profile.enabled_for(database_url)
+            engine = self._create_engine(database_url, writer=split)
+            configure_slow_query_log()
+            read_engines = [self._create_engine(read_url) for read_url in read_urls]
+            if split:
+                # Separate read connections on the same file; WAL keeps them from blocking the writer
+                reader = self._create_engine(database_url)
+                self.replicas = ReadReplicas([reader], lagged=False)
+                self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine,
+                                                 class_=sqlite_profile.RoutingSession, reader=reader)
+            else:
+                self.replicas = ReadReplicas(read_engines) if read_engines else None
+                self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+            shard_engines = [self._create_engine(shard_url) for shard_url in Config.get_shard_database_urls()]
+            self.shards = Shards(shard_engines) if shard_engines else None
+            if sqlite_profile.enabled_for(database_url):
+                self.maintenance = sqlite_profile.Maintenance(engine).start()
+            self._engine = engine
+            self._schema_checked = False
             logger.info("Database connection established successfully")
             return True
         except SQLAlchemyError as e:
             logger.error(f"Database connection failed: {e}")
             return False
     
+    def ensure_connected(self):
+        """Connect and check the schema once; safe to call from many threads"""
+        if self._engine is not None and self._schema_checked:
+            return
+        with self._connect_lock:
+            if self._engine is None and not self.connect():
+                raise Exception("Database not connected. Check DATABASE_URL.")
+            if not self._schema_checked:
+                self.ensure_schema()
+    
     def create_tables(self):
         """Create all tables"""
+        if self._engine is None and not self.connect():
+            return False
         try:
-            Base.metadata.create_all(bind=self.engine)
+            for engine in self._schema_engines():
+                Base.metadata.create_all(bind=engine)
+                # create_all() skips existing tables, so add indexes introduced since they were created
+                for table in Base.metadata.sorted_tables:
+                    for index in table.indexes:
+                        index.create(bind=engine, checkfirst=True)
+                if engine.dialect.name == 'sqlite':
+                    self._add_sqlite_autoincrement(engine)
+                self._write_schema_version(engine)
+            if self.shards:
+                backfill_directory(self._engine, self.shards.engines)
+            self._schema_checked = True
             logger.info("Tables created successfully")
             return True
         except SQLAlchemyError as e:
             logger.error(f"Table creation failed: {e}")
             return False
     
+    @staticmethod
+    def _add_sqlite_autoincrement(engine):
+        """Rebuild SQLite tables created before they were declared AUTOINCREMENT
+
+        Without it SQLite reuses the highest rowid once that row is deleted.
+        The rows keep their ids; the rebuilt table starts counting after the
+        largest. Search triggers go with the old table and are recreated by
+        the search backend.
+        """
+        with engine.begin() as conn:
+            for table in Base.metadata.sorted_tables:
+                if not table.dialect_options['sqlite']['autoincrement']:
+                    continue
+                sql = conn.execute(
+                    text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': table.name}
+                ).scalar()
+                if sql is None or 'AUTOINCREMENT' in sql.upper():
+                    continue
+                old = f"_{table.name}_old"
+                columns = ', '.join(f'"{column.name}"' for column in table.columns)
+                conn.execute(text(f'ALTER TABLE "{table.name}" RENAME TO "{old}"'))
+                for index in table.indexes:
+                    conn.execute(text(f'DROP INDEX IF EXISTS "{index.name}"'))
+                table.create(conn)
+                conn.execute(text(f'INSERT INTO "{table.name}" ({columns}) SELECT {columns} FROM "{old}"'))
+                conn.execute(text(f'DROP TABLE "{old}"'))
+                logger.info(f"Rebuilt table {table.name} with AUTOINCREMENT ids")
+
+    def _schema_engines(self):
+        """The primary engine plus every shard; each holds the full schema"""
+        return [self._engine] + (self.shards.engines if self.shards else [])
+    
+    @staticmethod
+    def _recorded_version(engine):
+        try:
+            with engine.connect() as conn:
+                return conn.execute(select(schema_version_table.c.version)).scalar()
+        except SQLAlchemyError:
+            # No schema_version table yet
+            return None
+    
+    def ensure_schema(self):
+        """Create tables only if the recorded schema version differs from SCHEMA_VERSION"""
+        if all(self._recorded_version(engine) == SCHEMA_VERSION for engine in self._schema_engines()):
+            self._schema_checked = True
+            logger.info("Schema is up to date")
+            return True
+        return self.create_tables()
+    
+    def _write_schema_version(self, engine):
+        with engine.begin() as conn:
+            schema_version_table.create(conn, checkfirst=True)
+            conn.execute(delete(schema_version_table))
+            conn.execute(insert(schema_version_table).values(version=SCHEMA_VERSION))
+    
     def get_session(self):
-        """Get database session"""
-        if not self.SessionLocal:
-            raise Exception("Database not connected. Call connect() first.")
+        """Get database session, connecting on first use"""
+        if not self.SessionLocal or not self._schema_checked:
+            self.ensure_connected()
         return self.SessionLocal()
     
+    def get_read_session(self):
+        """Get a session for reads: a healthy replica if configured, else the primary"""
+        self.ensure_connected()
+        engine = self.replicas.choose() if self.replicas else None
+        if engine is None:
+            return self.SessionLocal()
+        session = self.SessionLocal(bind=engine)
+        if self.replicas.lagged:
+            # See cache.reads_lagged()
+            session.info['lagged'] = True
+        return session
+    
+    def get_shard_sessions(self):
+        """A new session on every users shard, or None when sharding is off"""
+        self.ensure_connected()
+        return self.shards.sessions() if self.shards else None
+    
+    def init_app(self, app):
+        """Release request-scoped sessions when the Flask app context tears down"""
+        app.teardown_appcontext(self._teardown_session)
+        app.after_request(self._remember_write)
+    
+    def request_session(self):
+        """Get the session bound to the current Flask app context
+
+        The same session is returned for the rest of the request and is closed
+        (rolled back first if the request failed) by the teardown handler
+        registered with init_app().
+        """
+        from flask import g
+
+        session = g.get('db_session')
+        if session is None:
+            session = g.db_session = self.get_session()
+        return session
+    
+    def request_read_session(self):
+        """Get the read session for the current request
+
+        Uses the primary session when there are no replicas, or for
+        READ_YOUR_WRITES_SECONDS after this client made a write, so a
+        redirect after a POST sees its own change despite replica lag.
+        """
+        from flask import g, session as user_session
+
+        if not self.replicas or (self.replicas.lagged and user_session.get('_read_primary_until', 0) > time.time()):
+            return self.request_session()
+        session = g.get('db_read_session')
+        if session is None:
+            session = g.db_read_session = self.get_read_session()
+        return session
+    
+    def _remember_write(self, response):
+        from flask import g, request, session as user_session
+
+        if self.replicas and self.replicas.lagged and request.method not in ('GET', 'HEAD', 'OPTIONS') and 'db_session' in g:
+            user_session['_read_primary_until'] = time.time() + Config.READ_YOUR_WRITES_SECONDS
+        return response
+    
+    def _teardown_session(self, exc=None):
+        from flask import g
+
+        for key in ('db_session', 'db_read_session'):
+            session = g.pop(key, None)
+            if session is None:
+                continue
+            try:
+                if exc is not None:
+                    session.rollback()
+            finally:
+                session.close()
+    
+    def pool_stats(self):
+        """Connection pool usage for tuning pool size and concurrency"""
+        if not self._engine:
+            return {}
+        pool = self._engine.pool
+        stats = {'pool': type(pool).__name__, 'status': pool.status()}
+        if isinstance(pool, QueuePool):
+            stats.update({
+                'size': pool.size(),
+                'checked_in': pool.checkedin(),
+                'checked_out': pool.checkedout(),
+                'overflow': pool.overflow(),
+            })
+        if isinstance(pool, TimedQueuePool):
+            with pool._stats_lock:
+                stats.update({
+                    'checkouts': pool.checkouts,
+                    'timeouts': pool.timeouts,
+                    'total_wait_seconds': pool.total_wait,
+                    'avg_wait_seconds': pool.total_wait / pool.checkouts if pool.checkouts else 0.0,
+                    'max_wait_seconds': pool.max_wait,
+                })
+        if self.replicas:
+            stats['replicas'] = self.replicas.stats()
+        if self.shards:
+            stats['shards'] = self.shards.stats()
+        return stats
+    
+    def _after_fork(self):
+        """Drop pooled connections inherited from the parent process
+
+        close=False leaves the parent's sockets alone; the child opens its
+        own connections on first use.
+        """
+        if self._engine:
+            self._engine.dispose(close=False)
+        if self.replicas:
+            self.replicas.dispose(close=False)
+        if self.shards:
+            self.shards.dispose(close=False)
+        if self.maintenance:
+            self.maintenance.after_fork()
+    
     def close(self):
         """Close database connection"""
-        if self.engine:
-            self.engine.dispose()
+        if self._engine:
+            if self.maintenance:
+                self.maintenance.stop()
+                self.maintenance = None
+            self._engine.dispose()
+            if self.replicas:
+                self.replicas.dispose()
+                self.replicas = None
+            if self.shards:
+                self.shards.dispose()
+                self.shards = None
+            self._engine = None
+            self.SessionLocal = None
             logger.info("Database connection closed")
 
 # Global database instance
-db = Database() 
\ No newline at end of file
+db = Database()
+
+# Connections must never be shared between processes (pre-fork servers, multiprocessing)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=db._after_fork)
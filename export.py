@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Streaming CSV/JSONL export of the users/info tables
+
+Rows are fetched as plain column tuples through a server-side cursor and
+serialized batch by batch, so memory use does not grow with table size.
+"""
+
+import argparse
+import csv
+import io
+import json
+import logging
+import sys
+from datetime import datetime
+from sqlalchemy import select
+from models import User, Info
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 2000
+
+EXPORT_COLUMNS = ('id', 'name', 'email', 'phone', 'address', 'created_at', 'updated_at')
+
+TABLES = {
+    'users': User,
+    'info': Info,
+}
+
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+def iter_rows(session, model, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield lists of column tuples for every row of ``model``, ordered by id"""
+    columns = [getattr(model, name) for name in EXPORT_COLUMNS]
+    stmt = select(*columns).order_by(model.id).execution_options(yield_per=batch_size)
+    result = session.execute(stmt)
+    try:
+        for partition in result.partitions():
+            yield partition
+    finally:
+        result.close()
+
+
+def _format_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def iter_csv(batches):
+    """Serialize row batches to CSV text, one string per batch (header first)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue()
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([[_format_value(value) for value in row] for row in batch])
+        yield buffer.getvalue()
+
+
+def iter_jsonl(batches):
+    """Serialize row batches to JSON Lines text, one string per batch"""
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    for batch in batches:
+        yield ''.join(
+            dumps(dict(zip(EXPORT_COLUMNS, [_format_value(value) for value in row]))) + '\n'
+            for row in batch
+        )
+
+
+SERIALIZERS = {
+    'csv': iter_csv,
+    'jsonl': iter_jsonl,
+}
+
+
+def stream_export(session, table, fmt, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield the serialized export of ``table`` in ``fmt`` chunk by chunk"""
+    if table not in TABLES:
+        raise ValueError(f"Unknown table: {table}")
+    if fmt not in SERIALIZERS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    return SERIALIZERS[fmt](iter_rows(session, TABLES[table], batch_size))
+
+
+def main(argv=None):
+    """Command-line entry point: python export.py --table users --format csv -o users.csv"""
+    parser = argparse.ArgumentParser(description="Export users/info to CSV or JSONL")
+    parser.add_argument('--table', choices=sorted(TABLES), default='info')
+    parser.add_argument('--format', choices=sorted(SERIALIZERS), default='csv')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('-o', '--output', help="Output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    from database import db
+
+    if not db.connect():
+        print("❌ Could not connect to the database.", file=sys.stderr)
+        return 1
+    session = db.get_session()
+    out = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+    try:
+        for chunk in stream_export(session, args.table, args.format, args.batch_size):
+            out.write(chunk)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        session.close()
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
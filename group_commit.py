@@ -0,0 +1,215 @@
+"""
+Group commit for high-rate single-row inserts
+
+Callers hand rows to a GroupCommitWriter and block on a Future while one
+background thread drains the queue, inserting up to ``max_batch`` rows (or
+whatever arrived within ``max_delay`` seconds) per transaction. Every caller
+still gets its own inserted row back, or its own "Email already exists"
+error, but many callers share one commit (and one fsync).
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.exc import IntegrityError
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+RETURNED_COLUMNS = ('id', 'name', 'email', 'phone', 'address', 'created_at', 'updated_at')
+
+_STOP = object()
+
+
+class GroupCommitWriter:
+    """Background writer that batches inserts into ``model`` into shared transactions"""
+
+    def __init__(self, session_factory, model, max_batch=None, max_delay=None):
+        self.session_factory = session_factory
+        self.model = model
+        self.max_batch = max_batch or Config.GROUP_COMMIT_MAX_BATCH
+        self.max_delay = Config.GROUP_COMMIT_MAX_DELAY_MS / 1000.0 if max_delay is None else max_delay
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.rows = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name=f"group-commit-{self.model.__tablename__}", daemon=True
+                )
+                self._thread.start()
+
+    def stop(self, timeout=None):
+        """Flush queued rows and stop the writer thread"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def submit(self, values):
+        """Queue one row (a dict of column values); returns a Future of the inserted row"""
+        future = Future()
+        self.start()
+        self._queue.put((values, future))
+        return future
+
+    def insert(self, values, timeout=None):
+        """Insert one row and wait for its batch to commit; returns the row
+
+        Waits at most ``timeout`` seconds (default Config.GROUP_COMMIT_TIMEOUT),
+        then raises TimeoutError. A row whose batch was already being written
+        may still be committed.
+        """
+        timeout = Config.GROUP_COMMIT_TIMEOUT if timeout is None else timeout
+        future = self.submit(values)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            # Skipped by the writer unless its batch has started
+            future.cancel()
+            raise FutureTimeoutError(f"Group commit did not finish within {timeout}s")
+
+    def _collect(self, first):
+        """The first request plus whatever else arrives before the batch fills or the delay expires"""
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        stop = False
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stop = True
+                break
+            batch.append(item)
+        return batch, stop
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch, stop = self._collect(item)
+            # Callers that gave up (e.g. cancelled futures) are skipped
+            batch = [(values, future) for values, future in batch if future.set_running_or_notify_cancel()]
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception as e:
+                    # Keep the writer alive; only this batch's callers see the error
+                    logger.error(f"Group commit of {len(batch)} rows failed: {e}")
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(Exception("Failed to create record"))
+            if stop:
+                return
+
+    def _write(self, batch):
+        session = self.session_factory()
+        try:
+            try:
+                rows = self._insert_all(session, [values for values, _ in batch])
+                session.commit()
+                results = [(future, row, None) for (_, future), row in zip(batch, rows)]
+            except IntegrityError:
+                # At least one duplicate email: isolate it so the rest still commit together
+                session.rollback()
+                results = self._insert_one_by_one(session, batch)
+                session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Group commit of {len(batch)} rows failed: {e}")
+            for _, future in batch:
+                future.set_exception(Exception("Failed to create record"))
+            return
+        finally:
+            session.close()
+
+        self.batches += 1
+        self.rows += len(batch)
+        logger.debug(f"Group commit wrote {len(batch)} rows to {self.model.__tablename__}")
+        for future, row, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(row)
+
+    def _returning(self):
+        return [getattr(self.model, column) for column in RETURNED_COLUMNS]
+
+    def _insert_all(self, session, rows):
+        dialect = session.get_bind().dialect
+        if dialect.insert_executemany_returning_sort_by_parameter_order:
+            # One multi-row INSERT ... RETURNING, rows in the order they were queued
+            stmt = insert(self.model).returning(*self._returning(), sort_by_parameter_order=True)
+            return session.execute(stmt, rows).all()
+        return [session.execute(insert(self.model).values(**row).returning(*self._returning())).one()
+                for row in rows]
+
+    def _insert_one_by_one(self, session, batch):
+        results = []
+        for values, future in batch:
+            try:
+                with session.begin_nested():
+                    row = session.execute(insert(self.model).values(**values).returning(*self._returning())).one()
+                results.append((future, row, None))
+            except IntegrityError:
+                results.append((future, None, ValueError("Email already exists")))
+        return results
+
+    def stats(self):
+        return {
+            'table': self.model.__tablename__,
+            'batches': self.batches,
+            'rows': self.rows,
+            'avg_batch_size': self.rows / self.batches if self.batches else 0.0,
+            'queued': self._queue.qsize(),
+        }
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(engine, model):
+    """Shared GroupCommitWriter for ``model`` on ``engine``"""
+    key = (engine, model)
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None:
+            writer = _writers[key] = GroupCommitWriter(sessionmaker(bind=engine, autoflush=False), model)
+        return writer
+
+
+def _reset_after_fork():
+    # Writer threads do not survive fork(); children build their own writers
+    global _writers_lock
+    _writers.clear()
+    _writers_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+@atexit.register
+def stop_all():
+    """Flush every writer; registered to run at interpreter exit"""
+    with _writers_lock:
+        writers = list(_writers.values())
+    for writer in writers:
+        writer.stop(timeout=5)
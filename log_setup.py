@@ -0,0 +1,242 @@
+"""
+Logging setup: optional background writer, sampling and JSON output
+
+configure_logging() replaces ``logging.basicConfig`` for the app. With
+LOG_ASYNC enabled, log calls only put the record on a bounded in-process
+queue; a QueueListener thread formats and writes it, so request threads
+never wait on stderr or a file. When the queue is full, records are dropped
+(and counted) instead of blocking.
+
+Hot paths log through get_sampled_logger(), whose INFO and DEBUG records
+can be thinned out per message type, i.e. per logger and unformatted message
+template (``logger.info("User retrieved: %s", id)`` counts as one type
+whatever the id). LOG_SAMPLE_RATE keeps that fraction of each type, and
+LOG_RATE_LIMIT caps each type at that many records per second; the next
+record written after a suppressed stretch says how many were skipped.
+Dropped calls never build a LogRecord. Warnings and errors are always
+written.
+
+LOG_FORMAT=json writes one JSON object per line.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from config import Config
+
+# Message types tracked by a Sampler before its counters are reset
+MAX_MESSAGE_TYPES = 1024
+
+# Argument types that are safe to format later on the listener thread
+_PLAIN_ARGS = (str, int, float, bool, type(None))
+
+_listener = None
+_queue_handler = None
+_lock = threading.Lock()
+
+
+class Sampler:
+    """Sampling and rate-limiting decisions per (logger, message template)"""
+
+    def __init__(self, sample_rate=1.0, rate_limit=0):
+        self.every = max(1, round(1 / sample_rate)) if sample_rate > 0 else 0
+        self.rate_limit = rate_limit
+        self.active = self.every != 1 or bool(rate_limit)
+        self._types = {}
+        self._lock = threading.Lock()
+
+    def allow(self, name, msg):
+        """Returns (write it?, records suppressed since the last one written)"""
+        key = (name, msg if isinstance(msg, str) else type(msg))
+        now = time.monotonic()
+        with self._lock:
+            state = self._types.get(key)
+            if state is None:
+                if len(self._types) >= MAX_MESSAGE_TYPES:
+                    self._types.clear()
+                # [records seen, window start, written in window, suppressed]
+                state = self._types[key] = [0, now, 0, 0]
+            state[0] += 1
+            if not self.every or (state[0] - 1) % self.every:
+                state[3] += 1
+                return False, 0
+            if self.rate_limit:
+                if now - state[1] >= 1.0:
+                    state[1] = now
+                    state[2] = 0
+                if state[2] >= self.rate_limit:
+                    state[3] += 1
+                    return False, 0
+                state[2] += 1
+            suppressed, state[3] = state[3], 0
+        return True, suppressed
+
+
+# Shared by every SampledLogger that was not given its own Sampler
+_sampler = Sampler(Config.LOG_SAMPLE_RATE, Config.LOG_RATE_LIMIT)
+
+
+class SampledLogger(logging.LoggerAdapter):
+    """Logger for hot paths: INFO/DEBUG records are sampled before they are created
+
+    Skipped calls cost a dict lookup, not a LogRecord, so use lazy %-style
+    arguments (``logger.info("User retrieved: %s", user_id)``) rather than
+    f-strings, which would be formatted even when the record is dropped.
+    """
+
+    def __init__(self, logger, sampler=None):
+        super().__init__(logger, None)
+        self.sampler = sampler
+
+    def log(self, level, msg, *args, **kwargs):
+        if not self.logger.isEnabledFor(level):
+            return
+        sampler = self.sampler or _sampler
+        if level < logging.WARNING and sampler.active:
+            allowed, suppressed = sampler.allow(self.logger.name, msg)
+            if not allowed:
+                return
+            if suppressed:
+                kwargs['extra'] = {**kwargs.get('extra', {}), 'suppressed': suppressed}
+        # Report the caller of info()/debug(), not this method
+        kwargs['stacklevel'] = kwargs.get('stacklevel', 1) + 1
+        self.logger.log(level, msg, *args, **kwargs)
+
+
+def get_sampled_logger(name):
+    """logging.getLogger(name) wrapped in a SampledLogger using LOG_SAMPLE_RATE/LOG_RATE_LIMIT"""
+    return SampledLogger(logging.getLogger(name))
+
+
+class TextFormatter(logging.Formatter):
+    """logging.Formatter that notes how many similar records were suppressed"""
+
+    def format(self, record):
+        text = super().format(record)
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            text += f" [{suppressed} similar suppressed]"
+        return text
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            entry['suppressed'] = suppressed
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler that leaves formatting to the listener and never blocks
+
+    The stock QueueHandler formats the message in the calling thread so the
+    record can be pickled; this queue stays in-process, so only arguments
+    that could change or lazy-load before the listener gets to them (ORM
+    objects, lists...) are turned into strings here.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        if isinstance(record.args, tuple) and not all(isinstance(arg, _PLAIN_ARGS) for arg in record.args):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def make_formatter(log_format=None, fmt=None):
+    """Formatter for LOG_FORMAT ('text' or 'json'); ``fmt`` is the text layout"""
+    log_format = log_format or Config.LOG_FORMAT
+    if log_format == 'json':
+        return JsonFormatter()
+    if log_format != 'text':
+        raise ValueError(f"Unknown log format: {log_format}")
+    return TextFormatter(fmt or logging.BASIC_FORMAT)
+
+
+def configure_logging(level=None, fmt=None):
+    """Set up the root logger from Config once, like logging.basicConfig
+
+    Does nothing when the root logger already has handlers, so the first
+    caller's ``fmt`` wins.
+    """
+    global _listener, _queue_handler
+    root = logging.getLogger()
+    with _lock:
+        if root.handlers:
+            return
+        root.setLevel(level or Config.LOG_LEVEL)
+        stream = logging.StreamHandler(sys.stderr)
+        stream.setFormatter(make_formatter(fmt=fmt))
+        if Config.LOG_ASYNC:
+            _queue_handler = DeferredQueueHandler(queue.Queue(Config.LOG_QUEUE_SIZE))
+            handler = _queue_handler
+            _listener = QueueListener(_queue_handler.queue, stream, respect_handler_level=True)
+            _listener.start()
+        else:
+            handler = stream
+        root.addHandler(handler)
+
+
+def dropped():
+    """Records dropped because the LOG_ASYNC queue was full"""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+def shutdown():
+    """Write out queued records and stop the listener thread"""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None:
+        try:
+            listener.stop()
+        except queue.Full:
+            # No room for the stop sentinel; the daemon thread dies with the process
+            pass
+
+
+def _after_fork():
+    # The listener thread does not survive fork(); the child starts its own.
+    # Records queued but not yet written belong to the parent.
+    global _listener, _lock
+    _lock = threading.Lock()
+    if _listener is not None:
+        _queue_handler.queue = queue.Queue(Config.LOG_QUEUE_SIZE)
+        _listener = QueueListener(_queue_handler.queue, *_listener.handlers, respect_handler_level=True)
+        _listener.start()
+
+
+atexit.register(shutdown)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork)
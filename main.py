@@ -2,6 +2,9 @@
 """
 Basic CRUD Application with PostgreSQL
 A command-line interface to manage user records
+
+    python main.py        # web UI on http://127.0.0.1:5000
+    python main.py cli    # interactive menu (does not import Flask)
 """
 
 import sys
@@ -9,99 +12,33 @@ import json
 from database import db
 from crud import UserCRUD
 import logging
-from flask import Flask, render_template, request, redirect, url_for, flash
-from models import Info
+from log_setup import configure_logging
+from search import DEFAULT_SEARCH_LIMIT
+from projection import LIST_COLUMNS, SEARCH_COLUMNS
+from models import User
 import os
 
 # Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+configure_logging(fmt='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Suppress SQLAlchemy, Flask, and Werkzeug output except for the localhost link
+# Suppress SQLAlchemy output
 logging.getLogger('sqlalchemy.engine').setLevel(logging.ERROR)
-logging.getLogger('flask.app').setLevel(logging.ERROR)
-logging.getLogger('werkzeug').setLevel(logging.ERROR)
 
 # Optionally, set Flask to production mode to reduce output
 os.environ['FLASK_ENV'] = 'production'
 
-app = Flask(__name__)
-app.secret_key = os.environ.get('SECRET_KEY', 'dev')
-
-# Connect to the database at startup
-with app.app_context():
-    db.connect()
-    db.create_tables()
+_app = None
 
-@app.route('/')
-def index():
-    session = db.get_session()
-    infos = session.query(Info).all()
-    session.close()
-    return render_template('index.html', infos=infos)
-
-@app.route('/add', methods=['GET', 'POST'])
-def add_info():
-    if request.method == 'POST':
-        name = request.form['name']
-        email = request.form['email']
-        phone = request.form.get('phone')
-        address = request.form.get('address')
-        session = db.get_session()
-        info = Info(name=name, email=email, phone=phone, address=address)
-        session.add(info)
-        try:
-            session.commit()
-            flash('Info added successfully!', 'success')
-        except Exception as e:
-            session.rollback()
-            flash(f'Error: {str(e)}', 'danger')
-        finally:
-            session.close()
-        return redirect(url_for('index'))
-    return render_template('add_user.html')
-
-@app.route('/edit/<int:info_id>', methods=['GET', 'POST'])
-def edit_info(info_id):
-    session = db.get_session()
-    info = session.query(Info).get(info_id)
-    if not info:
-        session.close()
-        flash('Info not found.', 'danger')
-        return redirect(url_for('index'))
-    if request.method == 'POST':
-        info.name = request.form['name']
-        info.email = request.form['email']
-        info.phone = request.form.get('phone')
-        info.address = request.form.get('address')
-        try:
-            session.commit()
-            flash('Info updated successfully!', 'success')
-        except Exception as e:
-            session.rollback()
-            flash(f'Error: {str(e)}', 'danger')
-        finally:
-            session.close()
-        return redirect(url_for('index'))
-    session.close()
-    return render_template('edit_user.html', user=info)
-
-@app.route('/delete/<int:info_id>', methods=['POST'])
-def delete_info(info_id):
-    session = db.get_session()
-    info = session.query(Info).get(info_id)
-    if info:
-        session.delete(info)
-        try:
-            session.commit()
-            flash('Info deleted successfully!', 'success')
-        except Exception as e:
-            session.rollback()
-            flash(f'Error: {str(e)}', 'danger')
-    else:
-        flash('Info not found.', 'danger')
-    session.close()
-    return redirect(url_for('index'))
+def __getattr__(name):
+    """Build ``main.app`` on first access, so importing main does not import Flask"""
+    global _app
+    if name == 'app':
+        if _app is None:
+            from webapp import create_app
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def print_menu():
     """Display the main menu"""
@@ -115,7 +52,9 @@ def print_menu():
     print("5. Update user")
     print("6. Delete user")
     print("7. Search users")
-    print("8. Exit")
+    print("8. Bulk update users")
+    print("9. Bulk delete users")
+    print("10. Exit")
     print("="*50)
 
 def get_user_input():
@@ -145,7 +84,7 @@ def view_all_users(crud):
     """View all users"""
     print("\n--- ALL USERS ---")
     try:
-        users = crud.get_all_users()
+        users = crud.get_all_users(columns=LIST_COLUMNS)
         if not users:
             print("No users found.")
             return
@@ -267,12 +206,12 @@ def search_users(crud):
             print("❌ Please enter a search term.")
             return
         
-        users = crud.search_users(search_term)
+        users = crud.search_users(search_term, columns=SEARCH_COLUMNS)
         if not users:
             print(f"No users found matching '{search_term}'.")
             return
         
-        print(f"\nFound {len(users)} user(s) matching '{search_term}':")
+        print(f"\nFound {len(users)} user(s) matching '{search_term}' (best matches first, up to {DEFAULT_SEARCH_LIMIT}):")
         for user in users:
             print(f"\nID: {user.id}")
             print(f"Name: {user.name}")
@@ -282,18 +221,91 @@ def search_users(crud):
     except Exception as e:
         print(f"❌ Error: {e}")
 
+def parse_ids(text):
+    """Parse an id list such as ``3, 7, 10-20``"""
+    ids = []
+    for part in text.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = (int(value) for value in part.split('-', 1))
+            ids.extend(range(start, end + 1))
+        else:
+            ids.append(int(part))
+    return ids
+
+def get_filter():
+    """Ask for a column filter; a value containing % is matched with LIKE"""
+    column = input("Filter column (name, email, phone, address): ").strip()
+    if column not in ('name', 'email', 'phone', 'address'):
+        raise ValueError(f"Unknown column: {column}")
+    value = input("Filter value (% matches anything, empty matches no value): ").strip() or None
+    if value is not None and '%' in value:
+        return getattr(User, column).like(value)
+    return {column: value}
+
+def bulk_update_users(crud):
+    """Set fields on every user matching a filter"""
+    print("\n--- BULK UPDATE USERS ---")
+    try:
+        filters = get_filter()
+        print("Enter new values (leave empty to keep):")
+        values = {}
+        for field in ('name', 'phone', 'address'):
+            value = input(f"New {field}: ").strip()
+            if value:
+                values[field] = value
+        if not values:
+            print("❌ No values to update.")
+            return
+        confirm = input("\nUpdate every matching user? (yes/no): ").strip().lower()
+        if confirm == 'yes':
+            count = crud.bulk_update(filters, values)
+            print(f"✅ Updated {count} user(s).")
+        else:
+            print("❌ Update cancelled.")
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+
+def bulk_delete_users(crud):
+    """Delete users by id list or by filter"""
+    print("\n--- BULK DELETE USERS ---")
+    try:
+        text = input("Enter user IDs (e.g. 3, 7, 10-20), or leave empty to delete by filter: ").strip()
+        if text:
+            ids, filters = parse_ids(text), None
+            target = f"{len(ids)} user ID(s)"
+        else:
+            ids, filters = None, get_filter()
+            target = "every matching user"
+        confirm = input(f"\nAre you sure you want to delete {target}? (yes/no): ").strip().lower()
+        if confirm == 'yes':
+            count = crud.bulk_delete(ids=ids, filters=filters)
+            print(f"✅ Deleted {count} user(s).")
+        else:
+            print("❌ Deletion cancelled.")
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+
 def main():
     """Main application function"""
     print("🚀 Starting User Management System...")
     
     # Create CRUD instance
     session = db.get_session()
-    crud = UserCRUD(session)
+    read_session = db.get_read_session()
+    shard_sessions = db.get_shard_sessions()
+    crud = UserCRUD(session, read_session=read_session, shard_sessions=shard_sessions)
     
     try:
         while True:
             print_menu()
-            choice = input("\nEnter your choice (1-8): ").strip()
+            choice = input("\nEnter your choice (1-10): ").strip()
             
             if choice == '1':
                 create_user(crud)
@@ -310,10 +322,14 @@ def main():
             elif choice == '7':
                 search_users(crud)
             elif choice == '8':
+                bulk_update_users(crud)
+            elif choice == '9':
+                bulk_delete_users(crud)
+            elif choice == '10':
                 print("\n👋 Goodbye!")
                 break
             else:
-                print("❌ Invalid choice. Please enter a number between 1 and 8.")
+                print("❌ Invalid choice. Please enter a number between 1 and 10.")
             
             input("\nPress Enter to continue...")
     
@@ -323,8 +339,15 @@ def main():
         print(f"\n❌ Unexpected error: {e}")
     finally:
         session.close()
+        read_session.close()
+        for shard_session in shard_sessions or []:
+            shard_session.close()
         db.close()
 
 if __name__ == "__main__":
-    print(' * Running on http://127.0.0.1:5000')
-    app.run(debug=False) 
\ No newline at end of file
+    if sys.argv[1:] == ['cli']:
+        main()
+    else:
+        from webapp import create_app
+        print(' * Running on http://127.0.0.1:5000')
+        create_app().run(debug=False) 
\ No newline at end of file
@@ -0,0 +1,258 @@
+"""
+Query instrumentation and Prometheus metrics
+
+instrument_engine() hooks an engine's cursor-execute events to time every
+statement. Statements run while a request is being tracked (start_request /
+end_request, wired into Flask by init_app) are counted per request, repeated
+statement shapes are reported as likely N+1 patterns, and statements slower
+than Config.SLOW_QUERY_MS go to the ``slow_queries`` logger with their SQL
+normalized (literals and IN lists collapsed).
+"""
+
+import contextvars
+import logging
+import os
+import re
+import threading
+import time
+from sqlalchemy import event
+from config import Config
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger('slow_queries')
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+_current = contextvars.ContextVar('query_stats', default=None)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%\([^)]*\)s|%s|:\w+|\$\d+)(?:\s*,\s*(?:\?|%\([^)]*\)s|%s|:\w+|\$\d+))+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(statement):
+    """Reduce a statement to its shape so repeats can be grouped"""
+    statement = _STRING_LITERAL.sub('?', statement)
+    statement = _NUMBER_LITERAL.sub('?', statement)
+    statement = _PLACEHOLDER_LIST.sub('(...)', statement)
+    return _WHITESPACE.sub(' ', statement).strip()
+
+
+class QueryStats:
+    """Queries issued during one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.statements = {}
+        # Shard queries of one request run on several threads (sharding.scatter)
+        self._lock = threading.Lock()
+
+    def record(self, normalized, duration):
+        with self._lock:
+            self.count += 1
+            self.total_time += duration
+            self.statements[normalized] = self.statements.get(normalized, 0) + 1
+
+    def repeated(self, threshold):
+        """Statement shapes executed at least ``threshold`` times"""
+        return {sql: count for sql, count in self.statements.items() if count >= threshold}
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values"""
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._series.items()):
+                label_text = _labels(self.label_names, labels)
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {bucket_count}')
+                lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {count}')
+                lines.append(f"{self.name}_sum{{{label_text}}} {total}")
+                lines.append(f"{self.name}_count{{{label_text}}} {count}")
+        return lines
+
+
+class Counter:
+    """Monotonic counter keyed by a tuple of label values"""
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                label_text = _labels(self.label_names, labels)
+                lines.append(f"{self.name}{{{label_text}}} {value}" if label_text else f"{self.name} {value}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+request_latency = Histogram(
+    'http_request_duration_seconds', "HTTP request latency", ('method', 'route', 'status'), LATENCY_BUCKETS
+)
+request_db_time = Histogram(
+    'http_request_db_seconds', "Time spent in database queries per request", ('route',), LATENCY_BUCKETS
+)
+request_queries = Histogram(
+    'http_request_queries', "Database queries per request", ('route',), QUERY_COUNT_BUCKETS
+)
+queries_total = Counter('db_queries_total', "Database queries executed")
+query_seconds_total = Counter('db_query_seconds_total', "Time spent executing database queries")
+slow_queries_total = Counter('db_slow_queries_total', "Queries slower than SLOW_QUERY_MS")
+n_plus_one_total = Counter('db_n_plus_one_total', "Requests that repeated a query shape", ('route',))
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_started'].pop()
+    duration = time.perf_counter() - started
+    queries_total.inc()
+    query_seconds_total.inc(amount=duration)
+    stats = _current.get()
+    normalized = None
+    if stats is not None:
+        normalized = normalize_sql(statement)
+        stats.record(normalized, duration)
+    if duration * 1000 >= Config.SLOW_QUERY_MS:
+        slow_queries_total.inc()
+        slow_query_logger.warning(f"Slow query ({duration * 1000:.1f} ms): {normalized or normalize_sql(statement)}")
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute does not fire for failed statements
+    started = exception_context.connection.info.get('query_started') if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+def instrument_engine(engine):
+    """Time every statement run through ``engine`` (a sync Engine)"""
+    if event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        return engine
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(engine, 'handle_error', _handle_error)
+    return engine
+
+
+def configure_slow_query_log(path=None):
+    """Also write slow queries to ``path`` (Config.SLOW_QUERY_LOG by default)"""
+    path = path or Config.SLOW_QUERY_LOG
+    if not path:
+        return
+    path = os.path.abspath(path)
+    if any(getattr(h, 'baseFilename', None) == path for h in slow_query_logger.handlers):
+        return
+    handler = logging.FileHandler(path)
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+    slow_query_logger.addHandler(handler)
+
+
+def start_request():
+    """Begin collecting query stats for the current request; returns a reset token"""
+    return _current.set(QueryStats())
+
+
+def end_request(token, route):
+    """Stop collecting, record per-request metrics and flag N+1 patterns"""
+    stats = _current.get()
+    _current.reset(token)
+    if stats is None:
+        return None
+    request_db_time.observe((route,), stats.total_time)
+    request_queries.observe((route,), stats.count)
+    repeated = stats.repeated(Config.N_PLUS_ONE_THRESHOLD)
+    if repeated:
+        n_plus_one_total.inc((route,))
+        for sql, count in repeated.items():
+            logger.warning(f"Possible N+1 in {route}: {count} x {sql}")
+    return stats
+
+
+def render(pool_stats=None):
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in (request_latency, request_db_time, request_queries,
+                   queries_total, query_seconds_total, slow_queries_total, n_plus_one_total):
+        lines.extend(metric.render())
+    for key, value in (pool_stats or {}).items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            name = f"db_pool_{key}"
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+    return '\n'.join(lines) + '\n'
+
+
+def init_app(app, database):
+    """Track queries and latency for every request and serve GET /metrics"""
+    from flask import Response, g, request
+
+    @app.before_request
+    def _start_tracking():
+        g.metrics_started = time.perf_counter()
+        g.metrics_token = start_request()
+
+    @app.after_request
+    def _remember_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _finish_tracking(exc=None):
+        token = g.pop('metrics_token', None)
+        if token is None:
+            return
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        status = g.pop('metrics_status', 500)
+        request_latency.observe((request.method, route, status), time.perf_counter() - g.metrics_started)
+        end_request(token, route)
+
+    @app.route('/metrics')
+    def prometheus_metrics():
+        return Response(render(database.pool_stats()), mimetype='text/plain; version=0.0.4')
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Column, Integer, Float, String, DateTime, Text, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -7,6 +7,16 @@ Base = declarative_base()
 
 class User(Base):
     __tablename__ = 'users'
+    __table_args__ = (
+        # Keyset pagination indexes: (sort column, id) for each sortable column
+        Index('ix_users_created_at_id', 'created_at', 'id'),
+        Index('ix_users_name_id', 'name', 'id'),
+        # Change feed: rows modified after a (updated_at, id) cursor
+        Index('ix_users_updated_at_id', 'updated_at', 'id'),
+        # Never hand a deleted user's id to a new row: the change feed and
+        # clients that synced the tombstone would mistake one for the other
+        {'sqlite_autoincrement': True},
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
@@ -32,6 +42,12 @@ class User(Base):
 
 class Info(Base):
     __tablename__ = 'info'
+    __table_args__ = (
+        Index('ix_info_created_at_id', 'created_at', 'id'),
+        Index('ix_info_name_id', 'name', 'id'),
+        Index('ix_info_updated_at_id', 'updated_at', 'id'),
+        {'sqlite_autoincrement': True},
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
@@ -53,4 +69,41 @@ class Info(Base):
             'address': self.address,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        } 
\ No newline at end of file
+        }
+
+class Tombstone(Base):
+    """Marker left behind by a hard delete so the change feed can report it"""
+    __tablename__ = 'tombstones'
+    __table_args__ = (
+        Index('ix_tombstones_table_deleted_at_id', 'table_name', 'deleted_at', 'id'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    table_name = Column(String(50), nullable=False)
+    row_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, default=func.now(), nullable=False)
+    
+    def __repr__(self):
+        return f"<Tombstone(table='{self.table_name}', row_id={self.row_id})>"
+
+class IdSequence(Base):
+    """Last id handed out for a table on one users shard (see sharding.allocate_ids)"""
+    __tablename__ = 'id_sequences'
+    
+    table_name = Column(String(50), primary_key=True)
+    last_id = Column(Integer, nullable=False)
+    
+    def __repr__(self):
+        return f"<IdSequence(table='{self.table_name}', last_id={self.last_id})>"
+
+class UserShard(Base):
+    """Directory entry on the primary: the users shard holding the user with this email"""
+    __tablename__ = 'user_shards'
+    
+    email = Column(String(100), primary_key=True)
+    shard = Column(Integer, nullable=False)
+    # time.time() when a write reserved the entry (see UserCRUD._claim_email)
+    claimed_at = Column(Float, nullable=False)
+    
+    def __repr__(self):
+        return f"<UserShard(email='{self.email}', shard={self.shard})>"
@@ -0,0 +1,150 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import tuple_, literal, String
+
+# Columns a page may be ordered by; ``id`` is always appended as the tiebreaker
+SORT_COLUMNS = ('id', 'created_at', 'name')
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class Page:
+    """One page of keyset-paginated results"""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None, sort='id', limit=DEFAULT_PAGE_SIZE):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.sort = sort
+        self.limit = limit
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and 'dt' in value:
+        return datetime.fromisoformat(value['dt'])
+    return value
+
+
+def encode_cursor(sort, direction, row):
+    """Build an opaque cursor pointing just past ``row`` in ``direction``"""
+    payload = {
+        's': sort,
+        'd': direction,
+        'k': [_encode_value(getattr(row, sort)), row.id],
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor into (sort, direction, key)"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        sort, direction, key = payload['s'], payload['d'], payload['k']
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+    if sort not in SORT_COLUMNS or direction not in ('next', 'prev') or len(key) != 2:
+        raise ValueError("Invalid cursor")
+    return sort, direction, (_decode_value(key[0]), key[1])
+
+
+def _bind_key_value(query, value):
+    """Bind a cursor key value so it compares like the stored column value
+
+    SQLite keeps ``func.now()`` timestamps as 'YYYY-MM-DD HH:MM:SS' text while
+    SQLAlchemy binds datetimes with a microsecond suffix, which would make equal
+    timestamps compare as different strings.
+    """
+    if isinstance(value, datetime) and query.session.get_bind().dialect.name == 'sqlite':
+        text = value.strftime('%Y-%m-%d %H:%M:%S')
+        if value.microsecond:
+            text += f'.{value.microsecond:06d}'
+        return literal(text, String)
+    return value
+
+
+def clamp_limit(limit):
+    """Keep a requested page size within sane bounds"""
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def paginate(query, model, cursor=None, limit=DEFAULT_PAGE_SIZE, sort='id'):
+    """Return a Page of ``query`` results using keyset (seek) pagination
+
+    The query is ordered by ``(sort, id)`` and filtered with a row-value
+    comparison against the cursor key, so every page costs one index range
+    scan regardless of how deep it is.
+    """
+    limit = clamp_limit(limit)
+    direction = 'next'
+    key = None
+    if cursor:
+        sort, direction, key = decode_cursor(cursor)
+    if sort not in SORT_COLUMNS:
+        raise ValueError(f"Invalid sort column: {sort}")
+
+    id_col = model.id
+    if sort == 'id':
+        sort_key = (id_col,)
+        key = key[1:] if key else None
+    else:
+        sort_key = (getattr(model, sort), id_col)
+
+    if key is not None:
+        lhs = sort_key[0] if len(sort_key) == 1 else tuple_(*sort_key)
+        key = [_bind_key_value(query, value) for value in key]
+        rhs = key[0] if len(key) == 1 else tuple_(*key)
+        query = query.filter(lhs > rhs if direction == 'next' else lhs < rhs)
+
+    if direction == 'next':
+        query = query.order_by(*[col.asc() for col in sort_key])
+    else:
+        query = query.order_by(*[col.desc() for col in sort_key])
+
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if direction == 'prev':
+        rows.reverse()
+
+    next_cursor = prev_cursor = None
+    if rows:
+        # Going forward, "more" means a next page; the prev page exists iff we came from a cursor
+        if direction == 'next':
+            if has_more:
+                next_cursor = encode_cursor(sort, 'next', rows[-1])
+            if key is not None:
+                prev_cursor = encode_cursor(sort, 'prev', rows[0])
+        else:
+            if has_more:
+                prev_cursor = encode_cursor(sort, 'prev', rows[0])
+            next_cursor = encode_cursor(sort, 'next', rows[-1])
+
+    return Page(rows, next_cursor=next_cursor, prev_cursor=prev_cursor, sort=sort, limit=limit)
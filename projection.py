@@ -0,0 +1,70 @@
+"""
+Projection queries: read-only rows with only the columns a view needs
+
+List views do not need full ORM objects. A projection selects just the
+requested columns and returns plain namedtuple rows (``__slots__ = ()``, so
+no per-row ``__dict__``) that are never added to the session identity map.
+Rows support attribute access like model instances, so templates and CLI
+code read them the same way.
+"""
+
+from collections import namedtuple
+from functools import lru_cache
+from pagination import paginate, decode_cursor, DEFAULT_PAGE_SIZE
+
+# Columns shown by the list views (index page, CLI "view all")
+LIST_COLUMNS = ('id', 'name', 'email', 'phone', 'address', 'created_at', 'updated_at')
+
+# Columns shown in search results
+SEARCH_COLUMNS = ('id', 'name', 'email', 'phone')
+
+
+@lru_cache(maxsize=None)
+def row_class(model, columns):
+    """Namedtuple class for ``columns`` of ``model``; one class per column set"""
+    return namedtuple(f"{model.__name__}Row", columns)
+
+
+def _normalize(model, columns):
+    columns = tuple(columns)
+    for name in columns:
+        if name not in model.__table__.columns:
+            raise ValueError(f"Unknown column: {name}")
+    return columns
+
+
+def project(session, model, columns=LIST_COLUMNS):
+    """Query selecting only ``columns`` of ``model``, for use with the projected helpers"""
+    columns = _normalize(model, columns)
+    return session.query(*[getattr(model, name) for name in columns])
+
+
+def to_rows(model, columns, results):
+    """Convert result rows for ``columns`` into namedtuple rows"""
+    make = row_class(model, tuple(columns))._make
+    return [make(result) for result in results]
+
+
+def projected_page(session, model, columns=LIST_COLUMNS, cursor=None, limit=DEFAULT_PAGE_SIZE, sort='id'):
+    """Keyset-paginated Page of namedtuple rows
+
+    ``id`` and the sort columns are always selected since the page cursors
+    are built from them.
+    """
+    columns = _normalize(model, columns)
+    if cursor:
+        sort = decode_cursor(cursor)[0]
+    selected = columns + tuple(name for name in dict.fromkeys(('id', sort)) if name not in columns)
+    page = paginate(project(session, model, selected), model, cursor=cursor, limit=limit, sort=sort)
+    page.items = to_rows(model, selected, page.items)
+    return page
+
+
+def projected_by_ids(session, model, ids, columns=LIST_COLUMNS):
+    """Namedtuple rows for ``ids``, in the order given; missing ids are skipped"""
+    columns = _normalize(model, columns)
+    selected = columns if 'id' in columns else ('id',) + columns
+    if not ids:
+        return []
+    found = {row.id: row for row in to_rows(model, selected, project(session, model, selected).filter(model.id.in_(ids)))}
+    return [found[row_id] for row_id in ids if row_id in found]
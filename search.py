@@ -0,0 +1,283 @@
+"""
+Pluggable search backends for name/email lookups
+
+- FTS5Backend: SQLite FTS5 table with the trigram tokenizer, kept in sync by triggers
+- TrigramBackend: PostgreSQL pg_trgm GIN indexes, ranked by similarity()
+- NGramBackend: in-process trigram index, kept in sync by UserCRUD/route hooks
+- LikeBackend: the original unindexed ILIKE scan, used for very short terms
+"""
+
+import logging
+import threading
+from collections import defaultdict
+from sqlalchemy import select, text, func
+from sqlalchemy.exc import SQLAlchemyError
+from config import Config
+from projection import projected_by_ids
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEARCH_LIMIT = 50
+
+# Trigram indexes cannot serve terms shorter than one trigram
+MIN_INDEXED_TERM = 3
+
+
+def _trigrams(value):
+    value = value.lower()
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+class LikeBackend:
+    """Unindexed substring scan; correct for any term length but O(table)"""
+
+    name = 'like'
+
+    def __init__(self, model):
+        self.model = model
+
+    def setup(self, engine):
+        return True
+
+    def search(self, session, term, limit=DEFAULT_SEARCH_LIMIT):
+        """Return matching ids, best match first"""
+        model = self.model
+        pattern = f"%{term}%"
+        stmt = (
+            select(model.id)
+            .where(model.name.ilike(pattern) | model.email.ilike(pattern))
+            .order_by(model.id)
+            .limit(limit)
+        )
+        return list(session.scalars(stmt))
+
+    def index_row(self, row_id, name, email):
+        """Called after a row is created or updated"""
+
+    def remove_row(self, row_id):
+        """Called after a row is deleted"""
+
+    def rows_changed(self):
+        """Called after rows were written in bulk without per-row index_row() calls"""
+
+
+class FTS5Backend(LikeBackend):
+    """SQLite FTS5 external-content table using the trigram tokenizer"""
+
+    name = 'fts5'
+
+    def __init__(self, model):
+        super().__init__(model)
+        self.table = model.__tablename__
+        self.fts_table = f"{self.table}_fts"
+
+    def setup(self, engine):
+        table, fts = self.table, self.fts_table
+        objects = (fts, f"{fts}_ai", f"{fts}_ad", f"{fts}_au")
+        with engine.begin() as conn:
+            found = conn.execute(
+                text("SELECT count(*) FROM sqlite_master WHERE name IN (:fts, :ai, :ad, :au)"),
+                dict(zip(('fts', 'ai', 'ad', 'au'), objects)),
+            ).scalar()
+            if found == len(objects):
+                return True
+            # Recreating the base table drops its triggers but leaves the FTS
+            # table behind, so create whatever is missing and rebuild the index
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+                f"name, email, content='{table}', content_rowid='id', tokenize='trigram')"
+            ))
+            conn.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+                f"INSERT INTO {fts}(rowid, name, email) VALUES (new.id, new.name, new.email); END"
+            ))
+            conn.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, name, email) VALUES ('delete', old.id, old.name, old.email); END"
+            ))
+            conn.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF name, email ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, name, email) VALUES ('delete', old.id, old.name, old.email); "
+                f"INSERT INTO {fts}(rowid, name, email) VALUES (new.id, new.name, new.email); END"
+            ))
+            # Index rows that existed before the FTS table (or its triggers) were created
+            conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+        logger.info(f"Created FTS5 search index {fts}")
+        return True
+
+    def search(self, session, term, limit=DEFAULT_SEARCH_LIMIT):
+        if len(term) < MIN_INDEXED_TERM:
+            return super().search(session, term, limit)
+        query = '"' + term.replace('"', '""') + '"'
+        rows = session.execute(
+            text(f"SELECT rowid FROM {self.fts_table} WHERE {self.fts_table} MATCH :query "
+                 f"ORDER BY rank LIMIT :limit"),
+            {'query': query, 'limit': limit},
+        )
+        return [row[0] for row in rows]
+
+
+class TrigramBackend(LikeBackend):
+    """PostgreSQL pg_trgm GIN indexes; ILIKE is served by the index and ranked by similarity"""
+
+    name = 'trigram'
+
+    def setup(self, engine):
+        table = self.model.__tablename__
+        with engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            for column in ('name', 'email'):
+                conn.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS ix_{table}_{column}_trgm "
+                    f"ON {table} USING gin ({column} gin_trgm_ops)"
+                ))
+        return True
+
+    def search(self, session, term, limit=DEFAULT_SEARCH_LIMIT):
+        if len(term) < MIN_INDEXED_TERM:
+            return super().search(session, term, limit)
+        model = self.model
+        pattern = f"%{term}%"
+        score = func.greatest(func.similarity(model.name, term), func.similarity(model.email, term))
+        stmt = (
+            select(model.id)
+            .where(model.name.ilike(pattern) | model.email.ilike(pattern))
+            .order_by(score.desc(), model.id)
+            .limit(limit)
+        )
+        return list(session.scalars(stmt))
+
+
+class NGramBackend(LikeBackend):
+    """In-process trigram inverted index, loaded from the table on first use
+
+    Only writes made through this process are seen after the initial load, so
+    this is meant for single-process deployments or as a last resort.
+    """
+
+    name = 'ngram'
+
+    def __init__(self, model):
+        super().__init__(model)
+        self._lock = threading.RLock()
+        self._docs = {}
+        self._postings = defaultdict(set)
+        self._loaded = False
+
+    def _load(self, session):
+        model = self.model
+        rows = session.execute(select(model.id, model.name, model.email).execution_options(yield_per=5000))
+        with self._lock:
+            for row_id, name, email in rows:
+                self._add(row_id, name, email)
+            self._loaded = True
+        logger.info(f"Loaded {len(self._docs)} rows into n-gram search index")
+
+    def _add(self, row_id, name, email):
+        text_value = f"{name or ''}\x00{email or ''}".lower()
+        self._docs[row_id] = text_value
+        for gram in _trigrams(text_value):
+            self._postings[gram].add(row_id)
+
+    def _remove(self, row_id):
+        text_value = self._docs.pop(row_id, None)
+        if text_value is None:
+            return
+        for gram in _trigrams(text_value):
+            ids = self._postings.get(gram)
+            if ids:
+                ids.discard(row_id)
+                if not ids:
+                    del self._postings[gram]
+
+    def index_row(self, row_id, name, email):
+        with self._lock:
+            if not self._loaded:
+                return
+            self._remove(row_id)
+            self._add(row_id, name, email)
+
+    def remove_row(self, row_id):
+        with self._lock:
+            if self._loaded:
+                self._remove(row_id)
+
+    def rows_changed(self):
+        # Reload from the table on the next search
+        with self._lock:
+            self._docs = {}
+            self._postings = defaultdict(set)
+            self._loaded = False
+
+    def search(self, session, term, limit=DEFAULT_SEARCH_LIMIT):
+        if not self._loaded:
+            self._load(session)
+        needle = term.lower()
+        with self._lock:
+            if len(needle) < MIN_INDEXED_TERM:
+                candidates = self._docs.keys()
+            else:
+                postings = sorted((self._postings.get(gram, set()) for gram in _trigrams(needle)), key=len)
+                candidates = set.intersection(*postings) if postings else set()
+            matches = []
+            for row_id in candidates:
+                position = self._docs[row_id].find(needle)
+                if position >= 0:
+                    # Earlier matches in shorter values rank higher
+                    matches.append((position, len(self._docs[row_id]), row_id))
+        matches.sort()
+        return [row_id for _, _, row_id in matches[:limit]]
+
+
+BACKENDS = {
+    'like': LikeBackend,
+    'fts5': FTS5Backend,
+    'trigram': TrigramBackend,
+    'ngram': NGramBackend,
+}
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def _choose_backend(engine):
+    configured = Config.SEARCH_BACKEND
+    if configured != 'auto':
+        return configured
+    return {'sqlite': 'fts5', 'postgresql': 'trigram'}.get(engine.dialect.name, 'ngram')
+
+
+def get_search_backend(engine, model):
+    """Return the (set up) search backend for ``model`` on ``engine``"""
+    key = (engine, model)
+    backend = _registry.get(key)
+    if backend is not None:
+        return backend
+    with _registry_lock:
+        backend = _registry.get(key)
+        if backend is None:
+            name = _choose_backend(engine)
+            backend = BACKENDS.get(name, NGramBackend)(model)
+            try:
+                backend.setup(engine)
+            except SQLAlchemyError as e:
+                logger.warning(f"Search backend '{name}' unavailable, using in-process n-gram index: {e}")
+                backend = NGramBackend(model)
+            _registry[key] = backend
+    return backend
+
+
+def search_rows(session, backend, term, limit=DEFAULT_SEARCH_LIMIT, columns=None):
+    """Search with ``backend`` and load the matching model rows in ranked order
+
+    With ``columns``, lightweight projection rows are returned instead of
+    ORM objects (see projection.py).
+    """
+    ids = backend.search(session, term, limit)
+    if not ids:
+        return []
+    model = backend.model
+    if columns is not None:
+        return projected_by_ids(session, model, ids, columns)
+    rows = {row.id: row for row in session.query(model).filter(model.id.in_(ids))}
+    return [rows[row_id] for row_id in ids if row_id in rows]
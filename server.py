@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Pre-fork production server for the web app
+
+    python server.py --workers 8 --port 8000
+
+The master process binds the listening socket and forks N workers (default:
+one per CPU core) that accept on it, each with its own threaded WSGI server
+and its own database connections. Signals to the master:
+
+    SIGHUP            graceful restart: start fresh workers, then let the old
+                      ones finish their in-flight requests and exit
+    SIGTERM / SIGINT  graceful shutdown
+
+Workers import the app after forking, so a SIGHUP also picks up new code.
+With --preload the app is imported once in the master instead; workers
+start faster and share its memory, but a restart keeps the old code.
+"""
+
+import argparse
+import errno
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from config import Config
+from log_setup import configure_logging
+
+logger = logging.getLogger(__name__)
+
+# How long a worker may take to finish in-flight requests before it is killed
+GRACEFUL_TIMEOUT = 30
+
+
+def _load_app():
+    from webapp import create_app
+
+    return create_app()
+
+
+def worker_main(sock, app):
+    """Serve requests on the inherited socket until SIGTERM"""
+    from werkzeug.serving import make_server
+
+    if app is None:
+        app = _load_app()
+    host, port = sock.getsockname()[:2]
+    server = make_server(host, port, app, threaded=True, fd=sock.fileno())
+
+    def stop(signum, frame):
+        # shutdown() waits for serve_forever() to return, so call it off the main thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    logger.info(f"Worker {os.getpid()} serving")
+    server.serve_forever()
+    server.server_close()
+    # os._exit() skips atexit hooks, so flush queued group-commit inserts here
+    from group_commit import stop_all
+    from database import db
+    stop_all()
+    db.close()
+
+
+class Master:
+    """Keeps ``workers`` worker processes running and handles restart/shutdown signals"""
+
+    def __init__(self, host, port, workers, preload=False):
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.preload = preload
+        self.app = None
+        self.sock = None
+        self.children = {}
+        self.retiring = {}
+        self._signals = []
+
+    def bind(self):
+        family = socket.AF_INET6 if ':' in self.host else socket.AF_INET
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((self.host, self.port))
+        self.sock.listen(socket.SOMAXCONN)
+        self.sock.set_inheritable(True)
+        self.port = self.sock.getsockname()[1]
+
+    def spawn(self):
+        pid = os.fork()
+        if pid:
+            self.children[pid] = time.monotonic()
+            return pid
+        # Child: database engines are disposed by the at-fork hook in database.py
+        code = 0
+        try:
+            for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGCHLD):
+                signal.signal(signum, signal.SIG_DFL)
+            worker_main(self.sock, self.app)
+        except Exception as e:
+            logger.error(f"Worker {os.getpid()} crashed: {e}")
+            code = 1
+        finally:
+            os._exit(code)
+
+    def _on_signal(self, signum, frame):
+        self._signals.append(signum)
+
+    def _reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if self.children.pop(pid, None) is not None:
+                logger.warning(f"Worker {pid} exited with status {status}; restarting it")
+            self.retiring.pop(pid, None)
+
+    def _kill_retiring(self):
+        now = time.monotonic()
+        for pid, deadline in list(self.retiring.items()):
+            if now > deadline:
+                logger.warning(f"Worker {pid} did not stop within {GRACEFUL_TIMEOUT}s; killing it")
+                self._signal(pid, signal.SIGKILL)
+
+    @staticmethod
+    def _signal(pid, signum):
+        try:
+            os.kill(pid, signum)
+        except OSError as e:
+            if e.errno != errno.ESRCH:
+                raise
+
+    def restart(self):
+        """Replace every worker without dropping connections"""
+        logger.info("Graceful restart")
+        old = list(self.children)
+        self.children = {}
+        for _ in range(self.workers):
+            self.spawn()
+        for pid in old:
+            self.retiring[pid] = time.monotonic() + GRACEFUL_TIMEOUT
+            self._signal(pid, signal.SIGTERM)
+
+    def stop(self):
+        logger.info("Shutting down")
+        for pid in list(self.children):
+            self.retiring[pid] = time.monotonic() + GRACEFUL_TIMEOUT
+            self._signal(pid, signal.SIGTERM)
+        self.children = {}
+        while self.retiring:
+            self._reap()
+            self._kill_retiring()
+            time.sleep(0.1)
+
+    def run(self):
+        if self.preload:
+            self.app = _load_app()
+        self.bind()
+        for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+            signal.signal(signum, self._on_signal)
+        print(f" * Running on http://{self.host}:{self.port} with {self.workers} workers (master {os.getpid()})")
+        for _ in range(self.workers):
+            self.spawn()
+        while True:
+            while self._signals:
+                signum = self._signals.pop(0)
+                if signum in (signal.SIGTERM, signal.SIGINT):
+                    self.stop()
+                    return
+                if signum == signal.SIGHUP:
+                    self.restart()
+            self._reap()
+            self._kill_retiring()
+            while len(self.children) < self.workers:
+                self.spawn()
+            time.sleep(0.5)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the web app with pre-forked worker processes")
+    parser.add_argument('--host', default=Config.WEB_HOST)
+    parser.add_argument('--port', type=int, default=Config.WEB_PORT)
+    parser.add_argument('--workers', type=int, default=Config.WEB_WORKERS or os.cpu_count() or 1,
+                        help="Worker processes (default: number of CPU cores)")
+    parser.add_argument('--preload', action='store_true', help="Import the app in the master before forking")
+    args = parser.parse_args(argv)
+
+    if not hasattr(os, 'fork'):
+        print("❌ The pre-fork server needs os.fork(); use 'python main.py' on this platform.")
+        return 1
+    configure_logging(fmt='%(asctime)s - %(levelname)s - %(message)s')
+    Master(args.host, args.port, args.workers, args.preload).run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
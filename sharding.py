@@ -0,0 +1,276 @@
+"""
+Hash sharding of the users table across several databases
+
+When DATABASE_SHARD_URLS lists K databases, UserCRUD stores each user on
+shard ``hash(email) % K``. Ids are allocated so that the shard can also be
+derived from the id (shard ``i`` holds ids ``i + 1``, ``i + 1 + K``, ...),
+which keeps lookups, updates and deletes by id on a single shard. Each shard
+counts its ids in an ``id_sequences`` row. A user keeps its shard and id when
+its email changes, so the ``user_shards`` directory on the primary maps every
+email to its shard; it also keeps emails unique across shards.
+Listing and search fan out to every shard in parallel and merge the results.
+
+K is fixed once data is written: changing it needs a full re-shard.
+"""
+
+import base64
+import contextvars
+import hashlib
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from sqlalchemy import select, insert, update, delete, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+from models import IdSequence, Tombstone, User, UserShard
+from pagination import Page, decode_cursor, encode_cursor, clamp_limit
+from changes import ChangeBatch
+
+logger = logging.getLogger(__name__)
+
+# A directory entry this old whose user is missing was left by a write that
+# failed midway; younger ones may belong to a write still in progress
+STALE_CLAIM_SECONDS = 60
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def shard_for_email(email, count):
+    """Shard index for ``email``; stable across processes and Python versions"""
+    digest = hashlib.blake2b(email.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % count
+
+
+def shard_for_id(row_id, count):
+    """Shard index encoded in an id allocated by allocate_ids()"""
+    return (row_id - 1) % count
+
+
+def lookup_shards(session, emails):
+    """{email: shard index} from the user_shards directory, for the emails among ``emails`` it holds"""
+    emails = list(emails)
+    if not emails:
+        return {}
+    return dict(session.execute(select(UserShard.email, UserShard.shard).where(UserShard.email.in_(emails))).all())
+
+
+def claim_email(session, email, index):
+    """Add a directory entry pointing ``email`` at shard ``index`` and commit; False if one exists"""
+    try:
+        session.execute(insert(UserShard).values(email=email, shard=index, claimed_at=time.time()))
+        session.commit()
+        return True
+    except IntegrityError:
+        session.rollback()
+        return False
+
+
+def record_shards(session, shards):
+    """Add the missing directory entries for ``{email: shard index}``, e.g. after a bulk insert"""
+    missing = [email for email in shards if email not in lookup_shards(session, shards)]
+    now = time.time()
+    for email in missing:
+        try:
+            with session.begin_nested():
+                session.execute(insert(UserShard).values(email=email, shard=shards[email], claimed_at=now))
+        except IntegrityError:
+            # Recorded by a concurrent writer
+            pass
+    session.commit()
+
+
+def backfill_directory(primary, shard_engines):
+    """Add directory entries for users stored before the user_shards directory existed"""
+    now = time.time()
+    with primary.begin() as conn:
+        known = set(conn.scalars(select(UserShard.email)))
+        for index, engine in enumerate(shard_engines):
+            with engine.connect() as shard:
+                missing = [{'email': email, 'shard': index, 'claimed_at': now}
+                           for email in shard.scalars(select(User.email)) if email not in known]
+            if missing:
+                conn.execute(insert(UserShard), missing)
+                logger.info(f"Added {len(missing)} users of shard {index} to the shard directory")
+
+
+def release_emails(session, emails):
+    """Drop the directory entries of ``emails`` and commit"""
+    emails = list(emails)
+    if emails:
+        session.execute(delete(UserShard).where(UserShard.email.in_(emails)))
+        session.commit()
+
+
+def _first_id(conn, model, index, count):
+    """Smallest id for shard ``index`` above every id the shard has stored or deleted"""
+    highest = max(
+        conn.scalar(select(func.max(model.id))) or 0,
+        conn.scalar(select(func.max(Tombstone.row_id)).where(Tombstone.table_name == model.__tablename__)) or 0,
+    )
+    return highest + 1 + (index - highest) % count
+
+
+def allocate_ids(engine, model, index, count, n=1):
+    """Reserve ``n`` new ids on shard ``index``, each one mapping back to ``index``
+
+    The shard's id_sequences counter only moves forward, so ids of deleted
+    rows are never handed out again. It is bumped in its own short
+    transaction; ids reserved by a write that then fails are skipped.
+    """
+    name = model.__tablename__
+    step = n * count
+    while True:
+        with engine.begin() as conn:
+            bumped = conn.execute(
+                update(IdSequence).where(IdSequence.table_name == name).values(last_id=IdSequence.last_id + step)
+            ).rowcount
+            if bumped:
+                last = conn.scalar(select(IdSequence.last_id).where(IdSequence.table_name == name))
+                return list(range(last - step + count, last + 1, count))
+        try:
+            with engine.begin() as conn:
+                first = _first_id(conn, model, index, count)
+                conn.execute(insert(IdSequence).values(table_name=name, last_id=first + step - count))
+                return list(range(first, first + step, count))
+        except IntegrityError:
+            # Another writer created the counter first; bump it instead
+            continue
+
+
+class Shards:
+    """One engine and session factory per shard"""
+
+    def __init__(self, engines):
+        self.engines = engines
+        self.sessionmakers = [sessionmaker(autocommit=False, autoflush=False, bind=engine) for engine in engines]
+
+    def __len__(self):
+        return len(self.engines)
+
+    def sessions(self):
+        """A new session on every shard, in shard order"""
+        return [factory() for factory in self.sessionmakers]
+
+    def stats(self):
+        return [
+            {'url': engine.url.render_as_string(hide_password=True), 'pool': engine.pool.status()}
+            for engine in self.engines
+        ]
+
+    def dispose(self, close=True):
+        for engine in self.engines:
+            engine.dispose(close=close)
+
+
+def scatter(fn, sessions):
+    """Call ``fn(session)`` for every shard session in parallel; results in shard order"""
+    global _executor
+    if len(sessions) == 1:
+        return [fn(sessions[0])]
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=min(32, 4 * len(sessions)), thread_name_prefix='shard')
+        executor = _executor
+    # One copy of the caller's context per call, so metrics.py counts the shard
+    # queries towards the caller's request
+    contexts = [contextvars.copy_context() for _ in sessions]
+    return list(executor.map(lambda context, session: context.run(fn, session), contexts, sessions))
+
+
+def merge_by_id(results, skip, limit):
+    """Merge per-shard lists already ordered by id and apply skip/limit"""
+    merged = heapq.merge(*results, key=lambda row: row.id)
+    return [row for _, row in zip(range(skip + limit), merged)][skip:]
+
+
+def merge_ranked(results, limit):
+    """Interleave per-shard search results by their rank on each shard
+
+    Backend scores are not comparable across separate indexes, so the best
+    match of every shard comes first, then every shard's second best, etc.
+    """
+    ranked = [(rank, row.id, row) for rows in results for rank, row in enumerate(rows)]
+    ranked.sort(key=lambda item: item[:2])
+    return [row for _, _, row in ranked[:limit]]
+
+
+def merge_pages(pages, cursor, limit, sort):
+    """Combine the same keyset page fetched from every shard into one Page"""
+    limit = clamp_limit(limit)
+    direction = 'next'
+    if cursor:
+        sort, direction, _ = decode_cursor(cursor)
+    rows = sorted((row for page in pages for row in page), key=lambda row: (getattr(row, sort), row.id))
+    if direction == 'next':
+        has_more = len(rows) > limit or any(page.has_next for page in pages)
+        rows = rows[:limit]
+    else:
+        has_more = len(rows) > limit or any(page.has_prev for page in pages)
+        rows = rows[-limit:]
+
+    next_cursor = prev_cursor = None
+    if rows:
+        if direction == 'next':
+            if has_more:
+                next_cursor = encode_cursor(sort, 'next', rows[-1])
+            if cursor:
+                prev_cursor = encode_cursor(sort, 'prev', rows[0])
+        else:
+            if has_more:
+                prev_cursor = encode_cursor(sort, 'prev', rows[0])
+            next_cursor = encode_cursor(sort, 'next', rows[-1])
+    return Page(rows, next_cursor=next_cursor, prev_cursor=prev_cursor, sort=sort, limit=limit)
+
+
+def encode_shard_cursor(cursors):
+    """One opaque cursor holding a change-feed cursor per shard"""
+    raw = json.dumps(cursors, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_shard_cursor(cursor, count):
+    """Per-shard cursors from encode_shard_cursor(); ``None`` starts every shard from the beginning"""
+    if cursor is None:
+        return [None] * count
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursors = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    if not isinstance(cursors, list) or len(cursors) != count or not all(isinstance(c, str) for c in cursors):
+        raise ValueError("Invalid cursor")
+    return cursors
+
+
+def merge_changes(batches, limit):
+    """Merge the ChangeBatch of every shard into one, in timestamp order
+
+    Each shard's cursor only moves past the changes that made it into the
+    merged batch, so the rest are returned again by the next call.
+    """
+    tagged = [[(index, change) for change in batch] for index, batch in enumerate(batches)]
+    # Per shard, changes are ordered by time with deletes first on ties
+    merged = heapq.merge(*tagged, key=lambda item: (item[1].at, item[1].op != 'delete'))
+    taken = list(islice(merged, limit))
+    consumed = Counter(index for index, _ in taken)
+    cursors = [batch.cursor_after(consumed[index]) for index, batch in enumerate(batches)]
+    has_more = len(taken) < sum(len(batch) for batch in batches) or any(batch.has_more for batch in batches)
+    return ChangeBatch([change for _, change in taken], encode_shard_cursor(cursors), has_more)
+
+
+def _reset_after_fork():
+    # Executor threads do not survive fork()
+    global _executor, _executor_lock
+    _executor = None
+    _executor_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
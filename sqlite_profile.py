@@ -0,0 +1,147 @@
+"""
+High-performance settings for file-backed SQLite databases
+
+With SQLITE_PROFILE enabled (the default), every new SQLite connection gets
+the pragmas below. WAL journaling lets readers keep reading while a write is
+in progress. Database.connect() also gives the engine that writes a single
+pooled connection, and sends reads to a second engine on the same file.
+Writers in one process then queue in the pool and do not fight over the
+file lock. Sessions are RoutingSessions, so a SELECT only takes the write
+connection once its transaction has written something. A background thread
+runs ``PRAGMA optimize`` and a passive WAL checkpoint every
+SQLITE_MAINTENANCE_INTERVAL seconds.
+"""
+
+import logging
+import threading
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def is_file_database(url):
+    """True for SQLite URLs that point at a file (not :memory:)"""
+    url = make_url(url)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def pragmas():
+    """The PRAGMA statements applied to each new connection, in order"""
+    return [
+        f"PRAGMA journal_mode={Config.SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={Config.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA mmap_size={Config.SQLITE_MMAP_SIZE}",
+        f"PRAGMA cache_size={Config.SQLITE_CACHE_SIZE}",
+        f"PRAGMA temp_store={Config.SQLITE_TEMP_STORE}",
+        f"PRAGMA busy_timeout={Config.SQLITE_BUSY_TIMEOUT_MS}",
+    ]
+
+
+def _on_connect(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for statement in pragmas():
+            cursor.execute(statement)
+    finally:
+        cursor.close()
+
+
+def apply_profile(engine):
+    """Apply the pragmas to every new connection of ``engine``; idempotent, returns the engine"""
+    if Config.SQLITE_PROFILE and engine.dialect.name == 'sqlite' and not event.contains(engine, 'connect', _on_connect):
+        event.listen(engine, 'connect', _on_connect)
+    return engine
+
+
+def connect_args():
+    """DB-API connect() arguments: a larger prepared statement cache"""
+    return {'cached_statements': Config.SQLITE_STATEMENT_CACHE_SIZE}
+
+
+def _is_read(clause):
+    if clause is None:
+        return False
+    if getattr(clause, 'is_select', False):
+        return True
+    # Raw SQL such as the FTS5 MATCH query
+    text = getattr(clause, 'text', None)
+    return isinstance(text, str) and text.lstrip()[:6].upper() == 'SELECT'
+
+
+class RoutingSession(Session):
+    """Session that sends SELECTs to ``reader`` until its transaction writes
+
+    Once the transaction has flushed or run anything but a SELECT, every
+    statement goes to the write engine so it sees its own uncommitted changes.
+    The flag is cleared when the transaction ends.
+    """
+
+    def __init__(self, *args, reader=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reader = reader
+
+    def get_bind(self, mapper=None, *, clause=None, bind=None, **kw):
+        if bind is None and self.reader is not None and not self.info.get('_wrote'):
+            if not self._flushing and _is_read(clause):
+                return self.reader
+        if self._flushing or (clause is not None and not _is_read(clause)):
+            self.info['_wrote'] = True
+        return super().get_bind(mapper, clause=clause, bind=bind, **kw)
+
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def _transaction_ended(session, transaction):
+    if transaction.parent is None:
+        session.info.pop('_wrote', None)
+
+
+class Maintenance:
+    """Daemon thread running PRAGMA optimize and a passive WAL checkpoint periodically"""
+
+    def __init__(self, engine, interval=None):
+        self.engine = engine
+        self.interval = Config.SQLITE_MAINTENANCE_INTERVAL if interval is None else interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return self
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='sqlite-maintenance', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
+
+    def run_once(self):
+        """Returns the (busy, wal pages, checkpointed pages) result of the checkpoint"""
+        with self.engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA optimize")
+            result = conn.exec_driver_sql("PRAGMA wal_checkpoint(PASSIVE)").first()
+        logger.debug(f"SQLite maintenance: checkpoint {tuple(result) if result else None}")
+        return result
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except SQLAlchemyError as e:
+                logger.warning(f"SQLite maintenance failed: {e}")
+
+    def after_fork(self):
+        # The thread does not survive fork(); the child starts its own
+        self._thread = None
+        self.start()
+
+
+def enabled_for(url):
+    return Config.SQLITE_PROFILE and is_file_database(url)
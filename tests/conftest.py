@@ -0,0 +1,49 @@
+import os
+import sys
+import tempfile
+
+# Config reads the environment on import, so point it at a throwaway database first
+_TMP = tempfile.mkdtemp(prefix='crud-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_TMP, 'app.db')}"
+os.environ['DATABASE_READ_URLS'] = ''
+os.environ['DATABASE_SHARD_URLS'] = ''
+os.environ['GROUP_COMMIT_ENABLED'] = 'false'
+os.environ['SEARCH_BACKEND'] = 'like'
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from models import Base
+
+
+@pytest.fixture
+def make_engine(tmp_path):
+    """Create SQLite file databases holding the full schema"""
+    engines = []
+
+    def make(name):
+        engine = create_engine(f"sqlite:///{tmp_path / name}.db")
+        Base.metadata.create_all(bind=engine)
+        engines.append(engine)
+        return engine
+
+    yield make
+    for engine in engines:
+        engine.dispose()
+
+
+@pytest.fixture
+def make_session():
+    """Open sessions on an engine, closing them after the test"""
+    sessions = []
+
+    def make(engine):
+        session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+        sessions.append(session)
+        return session
+
+    yield make
+    for session in sessions:
+        session.close()
@@ -0,0 +1,37 @@
+import pytest
+
+from bulk_import import bulk_insert
+from crud import UserCRUD
+from models import User
+
+
+def _rows():
+    return [
+        {'name': 'Ann', 'email': 'ann@example.com'},
+        {'name': 'Dup', 'email': 'taken@example.com'},
+        {'name': '', 'email': 'noname@example.com'},
+        {'name': 'Dup', 'email': 'taken2@example.com'},
+        {'email': 'missing@example.com'},
+    ]
+
+
+@pytest.fixture
+def session(make_engine, make_session):
+    session = make_session(make_engine('primary'))
+    session.add_all([User(name='Taken', email='taken@example.com'), User(name='Taken', email='taken2@example.com')])
+    session.commit()
+    return session
+
+
+def test_errors_are_reported_in_row_order(session):
+    # Rows 2 and 4 fail the stored-email check, which runs after rows 3 and 5 failed validation
+    result = bulk_insert(session, User, _rows())
+
+    assert result.inserted == 1
+    assert [row for row, _ in result.errors] == [2, 3, 4, 5]
+
+
+def test_bulk_create_reports_errors_in_row_order(session):
+    result = UserCRUD(session, cache=None, group_commit=False).bulk_create(_rows())
+
+    assert [row for row, _ in result.errors] == [2, 3, 4, 5]
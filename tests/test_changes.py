@@ -0,0 +1,75 @@
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from changes import changes_since
+from models import User, Tombstone
+from sharding import merge_changes, decode_shard_cursor
+
+EARLIER = datetime(2020, 1, 1, 12, 0, 0, 250000)
+SAME_TIME = datetime(2020, 1, 1, 12, 0, 0, 500000)
+
+
+def _user(session, row_id, at):
+    session.add(User(id=row_id, name=f"user{row_id}", email=f"user{row_id}@example.com", updated_at=at))
+
+
+def _tombstone(session, row_id, at):
+    session.execute(insert(Tombstone).values(table_name='users', row_id=row_id, deleted_at=at))
+
+
+def _ops(changes):
+    return [(change.op, change.id) for change in changes]
+
+
+def test_delete_comes_before_an_upsert_with_the_same_timestamp(make_engine, make_session):
+    session = make_session(make_engine('primary'))
+    # Row 2 was deleted and written again within the same timestamp; the live row wins
+    _tombstone(session, 2, SAME_TIME)
+    _user(session, 2, SAME_TIME)
+    _user(session, 1, EARLIER)
+    session.commit()
+
+    batch = changes_since(session, User)
+
+    assert _ops(batch) == [('upsert', 1), ('delete', 2), ('upsert', 2)]
+    assert not batch.has_more
+
+
+def test_small_batches_resume_across_ties(make_engine, make_session):
+    session = make_session(make_engine('primary'))
+    for row_id in (1, 2, 3):
+        _tombstone(session, row_id + 10, SAME_TIME)
+        _user(session, row_id, SAME_TIME)
+    session.commit()
+
+    seen, cursor = [], None
+    while True:
+        batch = changes_since(session, User, cursor=cursor, limit=2)
+        seen += _ops(batch)
+        cursor = batch.cursor
+        if not batch.has_more:
+            break
+
+    assert seen == [('delete', 11), ('delete', 12), ('delete', 13), ('upsert', 1), ('upsert', 2), ('upsert', 3)]
+    assert len(changes_since(session, User, cursor=cursor)) == 0
+
+
+def test_shard_merge_keeps_deletes_first_on_ties(make_engine, make_session):
+    first = make_session(make_engine('shard0'))
+    second = make_session(make_engine('shard1'))
+    _user(first, 1, SAME_TIME)
+    _tombstone(second, 2, SAME_TIME)
+    _user(second, 4, EARLIER)
+    first.commit()
+    second.commit()
+
+    batch = merge_changes([changes_since(first, User), changes_since(second, User)], limit=2)
+
+    assert _ops(batch) == [('upsert', 4), ('delete', 2)]
+    assert batch.has_more
+    cursors = decode_shard_cursor(batch.cursor, 2)
+    rest = merge_changes([changes_since(first, User, cursor=cursors[0]),
+                          changes_since(second, User, cursor=cursors[1])], limit=2)
+    assert _ops(rest) == [('upsert', 1)]
+    assert not rest.has_more
@@ -0,0 +1,79 @@
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from config import Config
+from group_commit import GroupCommitWriter
+from models import Info
+
+
+def _writer(engine, **kwargs):
+    return GroupCommitWriter(sessionmaker(bind=engine, autoflush=False), Info, max_delay=0, **kwargs)
+
+
+def test_rows_and_duplicates_get_their_own_results(make_engine):
+    writer = _writer(make_engine('primary'))
+    try:
+        row = writer.insert({'name': 'A', 'email': 'a@example.com'})
+        assert row.id and row.email == 'a@example.com'
+        with pytest.raises(ValueError, match="Email already exists"):
+            writer.insert({'name': 'B', 'email': 'a@example.com'})
+    finally:
+        writer.stop(timeout=5)
+
+
+def test_a_failed_batch_fails_its_callers_and_the_writer_keeps_going(make_engine):
+    engine = make_engine('primary')
+    factory = sessionmaker(bind=engine, autoflush=False)
+    calls = []
+
+    def session_factory():
+        calls.append(None)
+        if len(calls) == 1:
+            raise RuntimeError("no connection")
+        return factory()
+
+    writer = GroupCommitWriter(session_factory, Info, max_delay=0)
+    try:
+        with pytest.raises(Exception, match="Failed to create record"):
+            writer.insert({'name': 'A', 'email': 'a@example.com'}, timeout=5)
+        assert writer.insert({'name': 'B', 'email': 'b@example.com'}, timeout=5).email == 'b@example.com'
+    finally:
+        writer.stop(timeout=5)
+
+
+def test_a_non_database_error_reaches_every_caller(make_engine, monkeypatch):
+    writer = _writer(make_engine('primary'))
+    insert_all = writer._insert_all
+
+    def fail_once(session, rows):
+        monkeypatch.setattr(writer, '_insert_all', insert_all)
+        raise TypeError("bad row")
+
+    monkeypatch.setattr(writer, '_insert_all', fail_once)
+    try:
+        with pytest.raises(Exception, match="Failed to create record"):
+            writer.insert({'name': 'A', 'email': 'a@example.com'}, timeout=5)
+        assert writer.insert({'name': 'B', 'email': 'b@example.com'}, timeout=5).id
+    finally:
+        writer.stop(timeout=5)
+
+
+def test_insert_waits_at_most_the_configured_timeout(make_engine, monkeypatch):
+    monkeypatch.setattr(Config, 'GROUP_COMMIT_TIMEOUT', 0.2)
+    factory = sessionmaker(bind=make_engine('primary'), autoflush=False)
+    release = threading.Event()
+
+    def stalled_factory():
+        release.wait(5)
+        return factory()
+
+    writer = GroupCommitWriter(stalled_factory, Info, max_delay=0)
+    try:
+        with pytest.raises(FutureTimeoutError):
+            writer.insert({'name': 'A', 'email': 'a@example.com'})
+    finally:
+        release.set()
+        writer.stop(timeout=5)
@@ -0,0 +1,66 @@
+from datetime import datetime
+
+import pytest
+
+from models import User
+from pagination import paginate, encode_cursor, decode_cursor
+
+# Microseconds make SQLite store the same text the cursor binds (see _bind_key_value)
+SAME_TIME = datetime(2020, 1, 1, 12, 0, 0, 500000)
+
+
+@pytest.fixture
+def session(make_engine, make_session):
+    session = make_session(make_engine('primary'))
+    # Three names, each shared by several users, all created at the same instant
+    session.add_all([
+        User(id=row_id, name=f"name{row_id % 3}", email=f"user{row_id}@example.com", created_at=SAME_TIME)
+        for row_id in range(1, 11)
+    ])
+    session.commit()
+    return session
+
+
+def _walk(session, sort, limit):
+    """Every page from the first, following next_cursor"""
+    pages = [paginate(session.query(User), User, limit=limit, sort=sort)]
+    while pages[-1].next_cursor:
+        pages.append(paginate(session.query(User), User, cursor=pages[-1].next_cursor, limit=limit))
+    return pages
+
+
+@pytest.mark.parametrize('sort, key', [
+    ('id', lambda user: user.id),
+    ('name', lambda user: (user.name, user.id)),
+    ('created_at', lambda user: (user.created_at, user.id)),
+])
+def test_pages_cover_every_row_once_in_sort_order(session, sort, key):
+    pages = _walk(session, sort, limit=3)
+
+    users = [user for page in pages for user in page]
+    assert [user.id for user in users] == [user.id for user in sorted(users, key=key)]
+    assert sorted(user.id for user in users) == list(range(1, 11))
+    assert [len(page) for page in pages] == [3, 3, 3, 1]
+
+
+@pytest.mark.parametrize('sort', ['id', 'name', 'created_at'])
+def test_prev_cursor_returns_the_previous_page(session, sort):
+    pages = _walk(session, sort, limit=3)
+
+    for previous, page in zip(pages, pages[1:]):
+        back = paginate(session.query(User), User, cursor=page.prev_cursor, limit=3)
+        assert [user.id for user in back] == [user.id for user in previous]
+    assert pages[0].prev_cursor is None
+
+
+def test_cursor_round_trip():
+    user = User(id=7, name='Ann', created_at=SAME_TIME)
+
+    assert decode_cursor(encode_cursor('name', 'next', user)) == ('name', 'next', ('Ann', 7))
+    assert decode_cursor(encode_cursor('created_at', 'prev', user)) == ('created_at', 'prev', (SAME_TIME, 7))
+
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor', '', 'e30', encode_cursor('email', 'next', User(id=1, email='a'))])
+def test_invalid_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor)
@@ -0,0 +1,78 @@
+from config import Config
+from cache import LRUCache, get_record
+from crud import UserCRUD
+from models import User
+
+
+def _crud(primary, replica, cache=None):
+    return UserCRUD(primary, cache=cache, group_commit=False, read_session=replica)
+
+
+def _replica_only_user(replica):
+    replica.add(User(id=1, name='Replica', email='replica@example.com'))
+    replica.commit()
+
+
+def test_reads_use_the_read_session(make_engine, make_session):
+    primary = make_session(make_engine('primary'))
+    replica = make_session(make_engine('replica'))
+    _replica_only_user(replica)
+    crud = _crud(primary, replica)
+
+    assert crud.reader is replica
+    assert crud.get_user_by_id(1).name == 'Replica'
+    assert crud.get_user_by_email('replica@example.com').id == 1
+
+
+def test_reads_follow_a_write_to_the_primary(make_engine, make_session, monkeypatch):
+    monkeypatch.setattr(Config, 'READ_YOUR_WRITES_SECONDS', 60.0)
+    primary = make_session(make_engine('primary'))
+    replica = make_session(make_engine('replica'))
+    crud = _crud(primary, replica)
+
+    user = crud.create_user('Primary', 'primary@example.com')
+
+    assert crud.reader is primary
+    assert crud.get_user_by_id(user.id).email == 'primary@example.com'
+
+
+def test_reads_return_to_the_replica_after_the_window(make_engine, make_session, monkeypatch):
+    monkeypatch.setattr(Config, 'READ_YOUR_WRITES_SECONDS', 0.0)
+    primary = make_session(make_engine('primary'))
+    replica = make_session(make_engine('replica'))
+    crud = _crud(primary, replica)
+
+    user = crud.create_user('Primary', 'primary@example.com')
+
+    assert crud.reader is replica
+    # Not replicated in this test, so the replica does not have it
+    assert crud.get_user_by_id(user.id) is None
+
+
+def test_lagged_replica_reads_are_not_cached(make_engine, make_session):
+    primary = make_session(make_engine('primary'))
+    replica = make_session(make_engine('replica'))
+    replica.info['lagged'] = True
+    _replica_only_user(replica)
+    cache = LRUCache(name='test')
+    crud = _crud(primary, replica, cache)
+
+    assert crud.get_user_by_id(1) is not None
+    assert crud.get_user_by_id(2) is None
+    assert get_record(cache, 'id', 1) == (False, None)
+    assert get_record(cache, 'id', 2) == (False, None)
+
+
+def test_current_replica_reads_are_cached(make_engine, make_session):
+    primary = make_session(make_engine('primary'))
+    replica = make_session(make_engine('replica'))
+    _replica_only_user(replica)
+    cache = LRUCache(name='test')
+    crud = _crud(primary, replica, cache)
+
+    crud.get_user_by_id(1)
+    crud.get_user_by_id(2)
+
+    hit, values = get_record(cache, 'id', 1)
+    assert hit and values['email'] == 'replica@example.com'
+    assert get_record(cache, 'id', 2) == (True, None)
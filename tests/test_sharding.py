@@ -0,0 +1,118 @@
+from collections import Counter
+
+import pytest
+from sqlalchemy import event, select, func
+
+import metrics
+from crud import UserCRUD
+from metrics import instrument_engine
+from models import User, UserShard
+from sharding import allocate_ids, shard_for_email, shard_for_id
+
+SHARDS = 3
+
+
+@pytest.fixture
+def cluster(make_engine, make_session):
+    """A primary plus SHARDS shard engines, with statements counted per shard"""
+    primary = make_engine('primary')
+    engines = [make_engine(f"shard{index}") for index in range(SHARDS)]
+    counts = Counter()
+    for index, engine in enumerate(engines):
+        event.listen(engine, 'before_cursor_execute',
+                     lambda *args, index=index: counts.update([index]))
+    crud = UserCRUD(make_session(primary), cache=None, group_commit=False,
+                    shard_sessions=[make_session(engine) for engine in engines])
+    return crud, engines, counts
+
+
+def _email_on(index, start=0):
+    """An email that hashes to shard ``index``"""
+    return next(f"user{n}@example.com" for n in range(start, start + 1000)
+                if shard_for_email(f"user{n}@example.com", SHARDS) == index)
+
+
+def _touched(counts, action):
+    counts.clear()
+    action()
+    return sorted(counts)
+
+
+def test_single_record_operations_touch_one_shard(cluster):
+    crud, _, counts = cluster
+    email = _email_on(1)
+    user_id = None
+
+    def create():
+        nonlocal user_id
+        user_id = crud.create_user('Ann', email).id
+
+    assert _touched(counts, create) == [1]
+    assert shard_for_id(user_id, SHARDS) == 1
+    assert _touched(counts, lambda: crud.get_user_by_id(user_id)) == [1]
+    assert _touched(counts, lambda: crud.get_user_by_email(email)) == [1]
+    # Not in the directory: only the shard a new user with that email would go to is asked
+    missing = 'nobody@example.com'
+    assert _touched(counts, lambda: crud.get_user_by_email(missing)) == [shard_for_email(missing, SHARDS)]
+
+
+def test_email_change_keeps_the_user_on_its_shard(cluster):
+    crud, _, counts = cluster
+    user = crud.create_user('Ann', _email_on(0))
+    moved = _email_on(2)
+
+    assert _touched(counts, lambda: crud.update_user(user.id, email=moved)) == [0]
+    assert _touched(counts, lambda: crud.get_user_by_email(moved)) == [0]
+    assert crud.get_user_by_email(moved).id == user.id
+    # The old email is free again
+    assert crud.create_user('Bob', _email_on(0)).id != user.id
+
+
+def test_emails_stay_unique_across_shards(cluster):
+    crud, _, _ = cluster
+    user = crud.create_user('Ann', _email_on(0))
+    taken = _email_on(2)
+    crud.update_user(user.id, email=taken)
+
+    # ``taken`` hashes to shard 2, but its user lives on shard 0
+    with pytest.raises(ValueError, match="Email already exists"):
+        crud.create_user('Bob', taken)
+    assert _touched(cluster[2], lambda: crud.delete_user(user.id)) == [0]
+    assert crud.create_user('Bob', taken).id != user.id
+    assert crud.db.scalar(select(func.count()).select_from(UserShard)) == 1
+
+
+def test_allocated_ids_map_back_to_their_shard_and_are_unique(cluster):
+    _, engines, _ = cluster
+    ids = {index: allocate_ids(engine, User, index, SHARDS, 5) + allocate_ids(engine, User, index, SHARDS, 3)
+           for index, engine in enumerate(engines)}
+
+    everything = [row_id for shard_ids in ids.values() for row_id in shard_ids]
+    assert len(set(everything)) == len(everything)
+    for index, shard_ids in ids.items():
+        assert shard_ids == sorted(shard_ids)
+        assert all(shard_for_id(row_id, SHARDS) == index for row_id in shard_ids)
+
+
+def test_ids_of_deleted_users_are_not_reused(cluster):
+    crud, _, _ = cluster
+    first = crud.create_user('Ann', _email_on(1))
+    crud.delete_user(first.id)
+
+    second = crud.create_user('Bob', _email_on(1, start=1000))
+
+    assert second.id > first.id
+    assert shard_for_id(second.id, SHARDS) == 1
+
+
+def test_parallel_shard_queries_count_towards_the_request(cluster):
+    crud, engines, _ = cluster
+    for engine in engines:
+        instrument_engine(engine)
+    crud.create_user('Ann', _email_on(0))
+
+    token = metrics.start_request()
+    crud.get_all_users()
+    stats = metrics.end_request(token, 'test')
+
+    assert stats.count >= SHARDS
@@ -0,0 +1,171 @@
+"""
+INSERT ... ON CONFLICT (email) DO UPDATE for the users and info tables
+
+A record whose email is already stored is updated in place, and only when
+one of its fields actually differs, so re-sending unchanged records leaves
+the row (and its ``updated_at``, and the change feed) alone. Nothing raises
+IntegrityError, so nothing has to be rolled back.
+
+Every record is reported as inserted, updated or unchanged. PostgreSQL
+tells inserts from updates with ``xmax`` in the RETURNING clause, so a
+chunk is one statement. Other dialects (SQLite) first read the stored
+values of the chunk's emails; a row stored by another writer in between is
+then reported as inserted.
+"""
+
+import time
+from collections import namedtuple
+from functools import lru_cache
+from sqlalchemy import select, or_, func, literal_column, bindparam, text
+from sqlalchemy.dialects import postgresql, sqlite
+
+DEFAULT_UPSERT_CHUNK_SIZE = 1000
+
+UPSERT_FIELDS = ('name', 'email', 'phone', 'address')
+UPDATE_FIELDS = ('name', 'phone', 'address')
+
+INSERTED = 'inserted'
+UPDATED = 'updated'
+UNCHANGED = 'unchanged'
+
+# id is None for unchanged rows: they are not written, so nothing returns it
+Upserted = namedtuple('Upserted', ('id', 'email', 'status'))
+
+_DIALECTS = {
+    'postgresql': postgresql,
+    'sqlite': sqlite,
+}
+
+
+class UpsertResult:
+    """Outcome of a batch upsert: per-status counts and the Upserted rows"""
+
+    def __init__(self):
+        self.rows = []
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def _count(self, status):
+        return sum(1 for row in self.rows if row.status == status)
+
+    @property
+    def inserted(self):
+        return self._count(INSERTED)
+
+    @property
+    def updated(self):
+        return self._count(UPDATED)
+
+    @property
+    def unchanged(self):
+        return self._count(UNCHANGED)
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+        return self
+
+    def __repr__(self):
+        return (f"<UpsertResult(inserted={self.inserted}, updated={self.updated}, "
+                f"unchanged={self.unchanged})>")
+
+
+def clean_rows(rows):
+    """Validate records for an upsert; a later record with the same email replaces an earlier one"""
+    by_email = {}
+    for row in rows:
+        values = {field: row.get(field) for field in UPSERT_FIELDS}
+        if not values['name'] or not values['email']:
+            raise ValueError("Name and email are required")
+        by_email.pop(values['email'], None)
+        by_email[values['email']] = values
+    return list(by_email.values())
+
+
+@lru_cache(maxsize=None)
+def upsert_statement(dialect_name, model):
+    """INSERT ... ON CONFLICT (email) DO UPDATE that skips rows with nothing to change
+
+    Built once per dialect and model; rows are passed as execute() parameters
+    so the compiled statement is cached too (insertmanyvalues batches them).
+    """
+    try:
+        module = _DIALECTS[dialect_name]
+    except KeyError:
+        raise NotImplementedError(f"Upsert is not supported on {dialect_name}")
+    stmt = module.insert(model)
+    excluded = stmt.excluded
+    changed = or_(*[getattr(model, field).is_distinct_from(excluded[field]) for field in UPDATE_FIELDS])
+    return stmt.on_conflict_do_update(
+        index_elements=[model.email],
+        set_={**{field: excluded[field] for field in UPDATE_FIELDS}, 'updated_at': func.now()},
+        where=changed,
+    )
+
+
+def _returning_columns(model, names):
+    return [getattr(model, name) if name in model.__table__.columns else literal_column(name) for name in names]
+
+
+@lru_cache(maxsize=None)
+def _single_row_statement(dialect_name, model, fields, returning):
+    # SQLAlchemy does not cache compiled ON CONFLICT inserts, and compiling
+    # one costs more than running it, so the SQL is kept as a text()
+    stmt = upsert_statement(dialect_name, model).values(
+        {field: bindparam(field) for field in fields}
+    ).returning(*_returning_columns(model, returning))
+    return text(str(stmt.compile(dialect=_DIALECTS[dialect_name].dialect(paramstyle='named'))))
+
+
+def _upsert_returning(session, model, rows, returning):
+    """Run the upsert for ``rows`` and return the ``returning`` columns of the rows written"""
+    dialect_name = session.get_bind().dialect.name
+    if len(rows) == 1:
+        statement = _single_row_statement(dialect_name, model, tuple(rows[0]), returning)
+        return session.execute(statement, rows[0]).all()
+    stmt = upsert_statement(dialect_name, model).returning(*_returning_columns(model, returning))
+    return session.execute(stmt, rows).all()
+
+
+def upsert_rows(session, model, rows):
+    """Upsert cleaned rows (see clean_rows) without committing; returns an Upserted per row, in order
+
+    Rows may also carry an ``id``, used only if the row is inserted.
+    """
+    if not rows:
+        return []
+    dialect = session.get_bind().dialect
+    emails = [row['email'] for row in rows]
+
+    if dialect.name == 'postgresql':
+        # xmax is 0 only for a row version created by an INSERT
+        returned = _upsert_returning(session, model, rows, ('id', 'email', 'xmax = 0'))
+        written = {email: Upserted(row_id, email, INSERTED if fresh else UPDATED) for row_id, email, fresh in returned}
+        return [written.get(email) or Upserted(None, email, UNCHANGED) for email in emails]
+
+    fields = [getattr(model, field) for field in UPDATE_FIELDS]
+    stored = {row[0]: tuple(row[1:]) for row in session.execute(
+        select(model.email, *fields).where(model.email.in_(emails))
+    )}
+    statuses = {}
+    for row in rows:
+        current = stored.get(row['email'])
+        if current is None:
+            statuses[row['email']] = INSERTED
+        elif current != tuple(row[field] for field in UPDATE_FIELDS):
+            statuses[row['email']] = UPDATED
+        else:
+            statuses[row['email']] = UNCHANGED
+    if dialect.insert_returning:
+        ids = dict(_upsert_returning(session, model, rows, ('email', 'id')))
+        for email in ids:
+            if statuses[email] == UNCHANGED:
+                # Changed by another writer after it was read
+                statuses[email] = UPDATED
+    else:
+        session.execute(upsert_statement(dialect.name, model), rows)
+        changed = [email for email in emails if statuses[email] != UNCHANGED]
+        ids = dict(session.execute(select(model.email, model.id).where(model.email.in_(changed))).all()) if changed else {}
+    return [
+        Upserted(None if statuses[email] == UNCHANGED else ids.get(email), email, statuses[email])
+        for email in emails
+    ]
@@ -0,0 +1,293 @@
+"""
+Flask web UI for the info table
+
+    from webapp import create_app
+    app = create_app()
+
+The app is built by create_app(); the database is connected lazily by the
+first request that needs it, so building an app (or importing this module)
+does not open a connection.
+"""
+
+import os
+import logging
+from flask import Flask, Response, jsonify, render_template, request, redirect, url_for, flash, abort, stream_with_context, make_response
+from flask import session as user_session
+from markupsafe import Markup
+from sqlalchemy import update, delete, func
+from config import Config
+from database import db
+from crud import execute_returning
+from models import Info
+from pagination import clamp_limit, SORT_COLUMNS, DEFAULT_PAGE_SIZE
+from export import stream_export, TABLES as EXPORT_TABLES, FORMATS as EXPORT_FORMATS
+from search import get_search_backend, search_rows, DEFAULT_SEARCH_LIMIT
+from projection import projected_page, LIST_COLUMNS
+from changes import record_deletion
+from bulk_ops import delete_chunks
+from upsert import upsert_rows, clean_rows, INSERTED, UNCHANGED
+from api import api
+from group_commit import get_writer
+import metrics
+from cache import info_cache, fragment_cache, row_to_dict, get_record, store_record, invalidate_record, bump_version, reads_lagged
+from cache import table_state, table_versions, version_tag
+from cache import all_stats as cache_stats
+
+logger = logging.getLogger(__name__)
+
+# Suppress Flask and Werkzeug output except for the localhost link
+logging.getLogger('flask.app').setLevel(logging.ERROR)
+logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+# (rule, view function, options) collected by @route and registered by create_app()
+_routes = []
+
+def route(rule, **options):
+    """Like app.route, for views registered on every app built by create_app()"""
+    def decorator(view):
+        _routes.append((rule, view, options))
+        return view
+    return decorator
+
+def create_app():
+    """Build the Flask app; the database connects on first use"""
+    app = Flask(__name__)
+    app.secret_key = os.environ.get('SECRET_KEY', 'dev')
+    for rule, view, options in _routes:
+        app.add_url_rule(rule, view_func=view, **options)
+    # Routes use db.request_session() for writes and db.request_read_session() for
+    # reads; both are released when the request ends
+    db.init_app(app)
+    app.register_blueprint(api)
+    # Per-request query counts/timings, slow-query log and GET /metrics
+    metrics.init_app(app, db)
+    return app
+
+def info_search_backend():
+    """Search backend for the info table"""
+    return get_search_backend(db.engine, Info)
+
+def load_info(info_id):
+    """Look up an info row as a column dict, through info_cache when enabled"""
+    hit, values = get_record(info_cache, 'id', info_id)
+    if hit:
+        return values
+    session = db.request_read_session()
+    info = session.query(Info).get(info_id)
+    values = row_to_dict(info) if info else None
+    if not reads_lagged(session):
+        store_record(info_cache, 'id', info_id, values)
+    return values
+
+@route('/')
+def index():
+    cursor = request.args.get('cursor')
+    sort = request.args.get('sort', 'id')
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE)
+    if sort not in SORT_COLUMNS:
+        sort = 'id'
+    # A pending flash follows this client's own write: render it and the
+    # table fresh, without 304s or cached fragments
+    pending_flashes = bool(user_session.get('_flashes'))
+    session = db.request_read_session()
+    etag = version_tag(table_state(session, Info))
+    if not pending_flashes and request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    # A page read from a lagging replica may predate the current version, so
+    # it is neither cached nor tagged with it
+    current = not reads_lagged(session)
+    use_fragments = fragment_cache is not None and not pending_flashes
+    # This process's write counter also separates writes that leave the table state unchanged
+    key = ('index', etag, table_versions.get(Info.__tablename__), cursor, sort, clamp_limit(limit))
+    fragment = fragment_cache.get(key) if use_fragments else None
+    if fragment is None:
+        try:
+            page = projected_page(session, Info, LIST_COLUMNS, cursor=cursor, limit=limit, sort=sort)
+        except ValueError:
+            flash('Invalid page cursor.', 'danger')
+            return redirect(url_for('index', sort=sort))
+        fragment = {
+            'html': render_template('_info_table.html', infos=page.items, page=page),
+            'sort': page.sort,
+            'limit': page.limit,
+        }
+        if use_fragments and current:
+            fragment_cache.set(key, fragment)
+
+    response = make_response(render_template(
+        'index.html',
+        table_html=Markup(fragment['html']),
+        paginated=True,
+        sort=fragment['sort'],
+        limit=fragment['limit'],
+        sort_columns=SORT_COLUMNS,
+    ))
+    if not pending_flashes and current:
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@route('/search')
+def search_info():
+    query = request.args.get('q', '').strip()
+    if not query:
+        return redirect(url_for('index'))
+    limit = max(1, min(request.args.get('limit', DEFAULT_SEARCH_LIMIT, type=int), DEFAULT_SEARCH_LIMIT * 10))
+    infos = search_rows(db.request_read_session(), info_search_backend(), query, limit, LIST_COLUMNS)
+    return render_template('index.html', infos=infos, page=None, paginated=False, sort_columns=SORT_COLUMNS, query=query)
+
+@route('/add', methods=['GET', 'POST'])
+def add_info():
+    if request.method == 'POST':
+        name = request.form['name']
+        email = request.form['email']
+        phone = request.form.get('phone')
+        address = request.form.get('address')
+        if request.form.get('upsert'):
+            return upsert_info({'name': name, 'email': email, 'phone': phone, 'address': address})
+        session = db.request_session()
+        try:
+            if Config.GROUP_COMMIT_ENABLED:
+                # Shares one commit with concurrent /add requests
+                values = {'name': name, 'email': email, 'phone': phone, 'address': address}
+                info_id = get_writer(db.engine, Info).insert(values).id
+            else:
+                info = Info(name=name, email=email, phone=phone, address=address)
+                session.add(info)
+                session.flush()
+                info_id = info.id
+                session.commit()
+            info_search_backend().index_row(info_id, name, email)
+            invalidate_record(info_cache, info_id, email)
+            bump_version(Info.__tablename__)
+            flash('Info added successfully!', 'success')
+        except Exception as e:
+            session.rollback()
+            flash(f'Error: {str(e)}', 'danger')
+        return redirect(url_for('index'))
+    return render_template('add_user.html')
+
+def upsert_info(values):
+    """/add with "update if the email exists": one INSERT ... ON CONFLICT, no rollback on duplicates"""
+    session = db.request_session()
+    try:
+        row = upsert_rows(session, Info, clean_rows([values]))[0]
+        session.commit()
+        if row.status != UNCHANGED:
+            info_search_backend().index_row(row.id, values['name'], row.email)
+            invalidate_record(info_cache, row.id, row.email)
+            bump_version(Info.__tablename__)
+        if row.status == UNCHANGED:
+            flash('Info already up to date.', 'info')
+        else:
+            flash(f'Info {"added" if row.status == INSERTED else "updated"} successfully!', 'success')
+    except Exception as e:
+        session.rollback()
+        flash(f'Error: {str(e)}', 'danger')
+    return redirect(url_for('index'))
+
+@route('/edit/<int:info_id>', methods=['GET', 'POST'])
+def edit_info(info_id):
+    if request.method == 'GET':
+        info = load_info(info_id)
+        if not info:
+            flash('Info not found.', 'danger')
+            return redirect(url_for('index'))
+        return render_template('edit_user.html', user=info)
+    session = db.request_session()
+    name = request.form['name']
+    email = request.form['email']
+    stmt = update(Info).where(Info.id == info_id).values(
+        name=name,
+        email=email,
+        phone=request.form.get('phone'),
+        address=request.form.get('address'),
+        updated_at=func.now(),
+    )
+    try:
+        if execute_returning(session, stmt, Info.id) is None:
+            session.rollback()
+            flash('Info not found.', 'danger')
+            return redirect(url_for('index'))
+        session.commit()
+        info_search_backend().index_row(info_id, name, email)
+        invalidate_record(info_cache, info_id, email)
+        bump_version(Info.__tablename__)
+        flash('Info updated successfully!', 'success')
+    except Exception as e:
+        session.rollback()
+        flash(f'Error: {str(e)}', 'danger')
+    return redirect(url_for('index'))
+
+@route('/delete/<int:info_id>', methods=['POST'])
+def delete_info(info_id):
+    session = db.request_session()
+    try:
+        row = execute_returning(session, delete(Info).where(Info.id == info_id), Info.email)
+        if row is None:
+            session.rollback()
+            flash('Info not found.', 'danger')
+            return redirect(url_for('index'))
+        record_deletion(session, Info, info_id)
+        session.commit()
+        info_search_backend().remove_row(info_id)
+        invalidate_record(info_cache, info_id, getattr(row, 'email', None))
+        bump_version(Info.__tablename__)
+        flash('Info deleted successfully!', 'success')
+    except Exception as e:
+        session.rollback()
+        flash(f'Error: {str(e)}', 'danger')
+    return redirect(url_for('index'))
+
+@route('/delete', methods=['POST'])
+def bulk_delete_info():
+    ids = request.form.getlist('ids', type=int)
+    if not ids:
+        flash('No records selected.', 'warning')
+        return redirect(url_for('index'))
+    session = db.request_session()
+    count = 0
+    try:
+        for rows in delete_chunks(session, Info, ids=ids):
+            for row in rows:
+                info_search_backend().remove_row(row.id)
+                invalidate_record(info_cache, row.id, row.email)
+            count += len(rows)
+        flash(f'Deleted {count} records.', 'success')
+    except Exception as e:
+        flash(f'Error after deleting {count} records: {str(e)}', 'danger')
+    finally:
+        if count:
+            bump_version(Info.__tablename__)
+    return redirect(url_for('index'))
+
+@route('/pool/stats')
+def pool_statistics():
+    return jsonify(db.pool_stats())
+
+@route('/cache/stats')
+def cache_statistics():
+    return jsonify(cache_stats())
+
+@route('/export.<fmt>')
+def export_table(fmt):
+    table = request.args.get('table', 'info')
+    if fmt not in EXPORT_FORMATS or table not in EXPORT_TABLES:
+        abort(404)
+
+    def generate():
+        # The session lives as long as the response body is being streamed
+        session = db.get_read_session()
+        try:
+            yield from stream_export(session, table, fmt)
+        finally:
+            session.close()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename={table}.{fmt}'},
+    )